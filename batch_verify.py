@@ -0,0 +1,173 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from engine import verify
+from ocr import get_reader_pool
+from warmup import WarmUp
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+OCR_LANGUAGES = ('en',)
+RETRY_STAGES = ('ocr', 'compare', 'memory')     # stage errors that do not decide a pair
+
+
+# Helper: Find <pair>_id.<ext>/<pair>_selfie.<ext> files or <pair>/id.<ext>, <pair>/selfie.<ext> folders
+def discover_pairs(directory):
+    found = {}
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                stem, ext = os.path.splitext(name)
+                if ext.lower() in IMAGE_EXTENSIONS and stem.lower() in ('id', 'selfie'):
+                    found.setdefault(entry, {})[stem.lower()] = os.path.join(path, name)
+            continue
+        stem, ext = os.path.splitext(entry)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        for role in ('id', 'selfie'):
+            if stem.lower().endswith('_' + role):
+                found.setdefault(stem[:-len(role) - 1], {})[role] = path
+
+    pairs = []
+    for pair_id, roles in found.items():
+        if 'id' in roles and 'selfie' in roles:
+            pairs.append({'pair_id': pair_id, 'id_path': roles['id'], 'selfie_path': roles['selfie']})
+        else:
+            print(f"Skipping incomplete pair: {pair_id}", file=sys.stderr)
+    return pairs
+
+
+# Helper: Read pairs from a CSV or JSONL manifest with id_path, selfie_path and optional pair_id
+def load_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    pairs = []
+    for i, row in enumerate(rows):
+        id_path = os.path.join(base, row['id_path'])
+        selfie_path = os.path.join(base, row['selfie_path'])
+        pair_id = row.get('pair_id') or f"{i}:{row['id_path']}"
+        pairs.append({'pair_id': str(pair_id), 'id_path': id_path, 'selfie_path': selfie_path})
+    return pairs
+
+
+# Helper: Whether a result row is a final decision rather than a failure worth retrying
+def is_final(row):
+    if row.get('decision') not in ('APPROVED', 'REJECTED'):
+        return False
+    # Gate rejections are decisions; OCR, comparison and memory-limit errors are retried
+    return not set(row.get('errors') or ()) & set(RETRY_STAGES)
+
+
+# Helper: pair_ids with a final decision in an earlier (possibly interrupted) run. Rows for
+# failed pairs stay in the file; a retried pair's later row supersedes them.
+def completed_pairs(output_path):
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                pair_id = row['pair_id']
+            except (ValueError, KeyError, TypeError):
+                continue  # partial last line from a crash
+            if is_final(row):
+                done.add(pair_id)
+            else:
+                done.discard(pair_id)
+    return done
+
+
+def _init_worker(warm_up):
+    # One reader per worker process; warming the models up front keeps the first pair fast.
+    # A failed step (e.g. missing OCR weights) is logged and its pairs fail on their own.
+    get_reader_pool(OCR_LANGUAGES, size=1)
+    if warm_up:
+        for name, step in WarmUp(OCR_LANGUAGES).run().status()['steps'].items():
+            if step['status'] == 'failed':
+                print(f"Worker {os.getpid()}: warm-up step {name} failed: {step['error']}", file=sys.stderr)
+
+
+# Run the verification engine for one ID/selfie pair
+def process_pair(pair):
+    result = {'pair_id': pair['pair_id'], 'id_path': pair['id_path'], 'selfie_path': pair['selfie_path']}
+    start = time.perf_counter()
+    try:
+        verification = verify(pair['id_path'], pair['selfie_path'], languages=OCR_LANGUAGES)
+        result.update(verification.to_dict())
+    except Exception as e:
+        result.update(decision='ERROR', error=f"{type(e).__name__}: {e}", timings_ms={})
+    result['timings_ms']['total'] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def json_default(value):
+    # numpy scalars (bool_, float64, int64) coming out of the OpenCV stages
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def run(pairs, output_path, workers, warm_up=True):
+    done = completed_pairs(output_path)
+    todo = [p for p in pairs if p['pair_id'] not in done]
+    print(f"{len(pairs)} pairs, {len(pairs) - len(todo)} already done, {len(todo)} to process", file=sys.stderr)
+    if not todo:
+        return 0
+
+    # Keep a bounded number of pairs in flight so huge manifests don't queue every future at once
+    max_in_flight = workers * 4
+    processed = 0
+    with open(output_path, 'a+', encoding='utf-8') as out:
+        out.seek(0, os.SEEK_END)
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != '\n':
+                out.write('\n')
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(warm_up,)) as executor:
+            pending = set()
+            queue = iter(todo)
+            while True:
+                for pair in queue:
+                    pending.add(executor.submit(process_pair, pair))
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    out.write(json.dumps(future.result(), default=json_default) + '\n')
+                    processed += 1
+                out.flush()
+                print(f"{processed}/{len(todo)} processed", file=sys.stderr)
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run RealEyes ID + selfie verification headlessly.")
+    parser.add_argument('input', help="Directory of pairs, or a .csv/.jsonl manifest with id_path and selfie_path")
+    parser.add_argument('-o', '--output', default='results.jsonl', help="JSONL results file (appended, resumable)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--no-warm-up', action='store_true', help="Skip the model warm-up in each worker")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.input):
+        pairs = discover_pairs(args.input)
+    else:
+        pairs = load_manifest(args.input)
+    run(pairs, args.output, max(1, args.workers), warm_up=not args.no_warm_up)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# Synthetic ID card and selfie fixtures for the benchmarks: rendered labels and dates, a
+# pasted face, the card photographed at a slight angle on a textured background.
+import io
+import random
+from dataclasses import dataclass, field
+from datetime import date
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+CARD_ASPECT = 85.6 / 54.0           # ID-1 card format
+
+
+@dataclass
+class Fixture:
+    width: int
+    id_rgb: np.ndarray
+    selfie_rgb: np.ndarray
+    id_jpeg: bytes
+    selfie_jpeg: bytes
+    dob: str
+    ocr_lines: list = field(default_factory=list)      # (box, text, confidence) as OCR would return them
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:       # Pillow < 10.1 has no scalable default font
+        return ImageFont.load_default()
+
+
+# Helper: A drawn face for runs without a face photo. The shading follows what the Haar
+# cascade keys on (dark brows and eye sockets over lighter cheeks, hair above the forehead),
+# so the face is detected and the benchmarks time the full path rather than the rejection.
+def synthetic_face(size=256, seed=0):
+    rng = np.random.default_rng(seed)
+    s = size
+    img = np.full((s, s, 3), (90, 110, 130), dtype=np.uint8)
+    centre = (s // 2, s // 2 + s // 20)
+    cv2.ellipse(img, (s // 2, s // 2 - s // 8), (int(s * 0.36), int(s * 0.34)), 0, 180, 360, (40, 30, 25), -1)
+    cv2.ellipse(img, centre, (int(s * 0.30), int(s * 0.40)), 0, 0, 360, (205, 165, 140), -1)
+    for dx in (-1, 1):
+        eye = (centre[0] + dx * int(s * 0.12), centre[1] - int(s * 0.08))
+        cv2.ellipse(img, (eye[0], eye[1] - int(s * 0.07)), (int(s * 0.08), int(s * 0.02)), 0, 0, 360, (50, 35, 30), -1)
+        cv2.ellipse(img, eye, (int(s * 0.07), int(s * 0.035)), 0, 0, 360, (70, 55, 50), -1)
+        cv2.circle(img, eye, int(s * 0.025), (25, 20, 20), -1)
+    cv2.ellipse(img, (centre[0], centre[1] + int(s * 0.10)), (int(s * 0.04), int(s * 0.015)), 0, 0, 360, (120, 80, 70), -1)
+    cv2.ellipse(img, (centre[0], centre[1] + int(s * 0.21)), (int(s * 0.10), int(s * 0.03)), 0, 0, 360, (130, 60, 60), -1)
+    img = cv2.GaussianBlur(img, (0, 0), s / 100)
+    noise = rng.normal(0, 4, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def _jpeg(rgb, quality=90):
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+
+# Helper: Render an ID card photo `width` pixels wide and a matching selfie
+def make_fixture(width, face_rgb=None, seed=0):
+    rnd = random.Random(seed)
+    face_rgb = synthetic_face(seed=seed) if face_rgb is None else face_rgb
+    dob = date(rnd.randint(1950, 2005), rnd.randint(1, 12), rnd.randint(1, 28))
+    issued = date(rnd.randint(2015, 2024), rnd.randint(1, 12), rnd.randint(1, 28))
+    dob_text = dob.strftime("%d/%m/%Y")
+
+    card_w = int(width * 0.8)
+    card_h = int(card_w / CARD_ASPECT)
+    card = Image.new('RGB', (card_w, card_h), (236, 240, 246))
+    draw = ImageDraw.Draw(card)
+    draw.rectangle([0, 0, card_w, int(card_h * 0.16)], fill=(240, 130, 40))
+    unit = card_h / 20
+    header_font, font = _font(max(8, int(unit * 1.6))), _font(max(8, int(unit * 1.1)))
+    draw.text((int(unit), int(unit * 0.6)), "GOVERNMENT OF INDIA", font=header_font, fill=(255, 255, 255))
+
+    face_w = int(card_w * 0.26)
+    face = Image.fromarray(face_rgb).resize((face_w, int(face_w * 1.2)))
+    card.paste(face, (int(unit), int(card_h * 0.22)))
+
+    lines = [
+        "Name: Asha Verma",
+        f"DOB: {dob_text}",
+        "Gender: Female",
+        f"Issue Date: {issued.strftime('%d/%m/%Y')}",
+        "1234 5678 9012",
+    ]
+    x = int(unit * 2 + face_w)
+    ocr_lines = []
+    for i, text in enumerate(lines):
+        y = int(card_h * 0.24 + i * unit * 2.2)
+        draw.text((x, y), text, font=font, fill=(20, 20, 20))
+        box = draw.textbbox((x, y), text, font=font)
+        ocr_lines.append((tuple(int(v) for v in box), text, 0.95))
+
+    # Photograph the card: textured background, slight perspective
+    height = int(width * 0.75)
+    background = np.random.default_rng(seed).normal(110, 25, (height, width, 3)).clip(0, 255).astype(np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 3)
+    card_rgb = np.array(card)
+    src = np.float32([[0, 0], [card_w, 0], [card_w, card_h], [0, card_h]])
+    ox, oy = (width - card_w) / 2, (height - card_h) / 2
+    jitter = width * 0.02
+    dst = np.float32([
+        [ox + jitter, oy], [ox + card_w, oy + jitter], [ox + card_w - jitter, oy + card_h], [ox, oy + card_h - jitter]
+    ])
+    warp = cv2.getPerspectiveTransform(src, dst)
+    id_rgb = cv2.warpPerspective(card_rgb, warp, (width, height), dst=background, borderMode=cv2.BORDER_TRANSPARENT)
+
+    # Selfie: the same face large and centred on a plain background
+    selfie_h = int(width * 0.75)
+    selfie = np.full((selfie_h, width, 3), (200, 205, 210), dtype=np.uint8)
+    side = int(selfie_h * 0.55)
+    resized = cv2.resize(face_rgb, (side, int(side * 1.2)))[:selfie_h]
+    top, left = (selfie_h - resized.shape[0]) // 2, (width - side) // 2
+    selfie[top:top + resized.shape[0], left:left + side] = resized
+
+    return Fixture(width, id_rgb, selfie, _jpeg(id_rgb), _jpeg(selfie), dob_text, ocr_lines)
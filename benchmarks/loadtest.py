@@ -0,0 +1,136 @@
+# Load test for service.py: posts the same ID + selfie pair from N concurrent keep-alive
+# connections and reports throughput, latency percentiles, status codes and mean stage timings.
+#
+#   python service.py --workers 2 &
+#   python -m benchmarks.loadtest --id id.jpg --selfie selfie.jpg [--requests 200] [--concurrency 8] [--json]
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict
+
+
+def _multipart(id_bytes, selfie_bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, data in (('id', id_bytes), ('selfie', selfie_bytes)):
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{name}.jpg"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n'
+        )
+    return f'multipart/form-data; boundary={boundary}', b''.join(parts) + f'--{boundary}--\r\n'.encode()
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', '0')))
+    return status, headers, body
+
+
+async def _client(host, port, request, remaining, results):
+    reader = writer = None
+    while remaining:
+        remaining.pop()
+        if writer is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        start = time.perf_counter()
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, headers, body = await _read_response(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            results.append((time.perf_counter() - start, 'connection_error', None))
+            writer = None
+            continue
+        elapsed = time.perf_counter() - start
+        payload = json.loads(body) if body else None
+        results.append((elapsed, status, payload))
+        if headers.get('connection') == 'close':
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def run(host, port, id_bytes, selfie_bytes, requests, concurrency):
+    content_type, body = _multipart(id_bytes, selfie_bytes)
+    request = (
+        f"POST /verify HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+    remaining = list(range(requests))
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, request, remaining, results) for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed * 1000 for elapsed, status, _ in results if status == 200]
+    stages = defaultdict(list)
+    for _, status, payload in results:
+        if status == 200:
+            for stage, ms in payload['timings_ms'].items():
+                stages[stage].append(ms)
+    return {
+        'requests': len(results),
+        'concurrency': concurrency,
+        'wall_seconds': wall,
+        'throughput_rps': sum(1 for _, status, _ in results if status == 200) / wall if wall else 0.0,
+        'status_counts': {str(status): count for status, count in Counter(s for _, s, _ in results).items()},
+        'latency_ms': {
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'mean': statistics.fmean(latencies) if latencies else None,
+        },
+        'stage_mean_ms': {stage: statistics.fmean(values) for stage, values in sorted(stages.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the verification HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--id', required=True, help="ID photo to post")
+    parser.add_argument('--selfie', required=True, help="Selfie to post")
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    with open(args.id, 'rb') as f:
+        id_bytes = f.read()
+    with open(args.selfie, 'rb') as f:
+        selfie_bytes = f.read()
+    report = asyncio.run(run(args.host, args.port, id_bytes, selfie_bytes, args.requests, args.concurrency))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    latency = report['latency_ms']
+    print(f"{report['requests']} requests, concurrency {report['concurrency']}, {report['wall_seconds']:.1f}s")
+    print(f"throughput: {report['throughput_rps']:.2f} req/s   status: {report['status_counts']}")
+    if latency['p50'] is not None:
+        print(f"latency ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  p99 {latency['p99']:.1f}")
+    for stage, ms in report['stage_mean_ms'].items():
+        print(f"  {stage:<16}{ms:>10.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
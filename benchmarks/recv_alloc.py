@@ -0,0 +1,129 @@
+# Micro-benchmark for the webcam hot loop: time and transient memory per VideoProcessor.recv call.
+# Compares the original per-frame implementation with the current one (analysing every frame,
+# and with the adaptive scheduler).
+#
+#   python -m benchmarks.recv_alloc [--frames 300] [--image face.jpg] [--json]
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+import av
+import cv2
+import numpy as np
+
+from detectors import get_face_cascade
+from live_camera import VideoProcessor, draw_overlay
+
+
+class _Frame:
+    # Stands in for av.VideoFrame: to_ndarray returns a fresh array like PyAV does
+    def __init__(self, img):
+        self.img = img
+
+    def to_ndarray(self, format=None):
+        return self.img.copy()
+
+
+# The per-frame work recv did before buffers were reused (including the unused RGB conversion)
+class LegacyProcessor:
+    def __init__(self):
+        self.latest_frame = None
+
+    def recv(self, frame):
+        img = frame.to_ndarray(format="bgr24")
+        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)  # noqa: F841 - kept to match the old loop
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
+        brightness = np.mean(gray)
+        contrast = gray.std()
+        faces = get_face_cascade().detectMultiScale(gray, 1.2, 5)
+        box = tuple(max(faces, key=lambda face: face[2] * face[3])) if len(faces) > 0 else None
+        draw_overlay(img, {
+            'blur_score': blur_score,
+            'brightness_score': brightness,
+            'contrast_score': contrast,
+            'face_box': box,
+            'face_centered': False,
+            'face_size_ok': False,
+        })
+        self.latest_frame = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return av.VideoFrame.from_ndarray(img, format="bgr24")
+
+
+def _every_frame_processor():
+    processor = VideoProcessor()
+    processor.scheduler.max_interval = 1
+    return processor
+
+
+def _frames(image_path, count):
+    if image_path:
+        base = cv2.resize(cv2.imread(image_path), (640, 480))
+    else:
+        rng = np.random.default_rng(0)
+        base = (rng.random((480, 640, 3)) * 255).astype(np.uint8)
+    # Small shifts so change detection and tracking see a moving scene
+    return [_Frame(np.roll(base, i % 8, axis=1)) for i in range(count)]
+
+
+def measure(factory, frames, warmup=10):
+    processor = factory()
+    for frame in frames[:warmup]:
+        processor.recv(frame)
+
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        processor.recv(frame)
+        times.append(time.perf_counter() - start)
+
+    # Transient memory: peak allocation above the steady state during each recv call
+    processor = factory()
+    for frame in frames[:warmup]:
+        processor.recv(frame)
+    tracemalloc.start()
+    peaks = []
+    for frame in frames:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        processor.recv(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+    tracemalloc.stop()
+
+    return {
+        'frames': len(frames),
+        'ms_per_frame_p50': statistics.median(times) * 1000,
+        'ms_per_frame_mean': statistics.fmean(times) * 1000,
+        'transient_kib_per_frame_p50': statistics.median(peaks) / 1024,
+        'transient_kib_per_frame_max': max(peaks) / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory per VideoProcessor.recv call")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--image', help="Optional face photo to use instead of noise")
+    parser.add_argument('--json', action='store_true', help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    frames = _frames(args.image, args.frames)
+    results = {
+        'before': measure(LegacyProcessor, frames),
+        'after_every_frame': measure(_every_frame_processor, frames),
+        'after_adaptive': measure(VideoProcessor, frames),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'variant':<20}{'p50 ms':>10}{'mean ms':>10}{'p50 KiB':>12}{'max KiB':>12}")
+    for name, r in results.items():
+        print(f"{name:<20}{r['ms_per_frame_p50']:>10.2f}{r['ms_per_frame_mean']:>10.2f}"
+              f"{r['transient_kib_per_frame_p50']:>12.1f}{r['transient_kib_per_frame_max']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
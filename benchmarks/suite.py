@@ -0,0 +1,239 @@
+# Benchmark suite: times every pipeline stage, separately and end to end, on synthetic ID
+# card / selfie fixtures at several resolutions. Results (p50/p95/p99 latency, throughput,
+# peak RSS) are written as JSON so runs can be compared.
+#
+#   python -m benchmarks.suite [--resolutions 640 1280 2560] [--iterations 20] [--face face.jpg]
+#                              [-o results.json] [--compare baseline.json]
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+import engine
+from benchmarks.fixtures import make_fixture
+from embeddings import get_embedder
+from images import ImageHandle, normalize_document
+
+STAGES = (
+    'decode', 'extract_dob', 'calculate_age', 'extract_face', 'check_image_quality',
+    'compare', 'ocr', 'recv', 'end_to_end',
+)
+SLOW_STAGES = ('ocr', 'end_to_end')     # seconds per call on CPU; run --slow-iterations times
+
+
+class _Frame:
+    # Stands in for av.VideoFrame
+    def __init__(self, img):
+        self.img = img
+
+    def to_ndarray(self, format=None):
+        return self.img.copy()
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))]
+
+
+def summarize(times, first):
+    ordered = sorted(times)
+    total = sum(times)
+    return {
+        'iterations': len(times),
+        'first_call_ms': first * 1000,
+        'p50_ms': _percentile(ordered, 50) * 1000,
+        'p95_ms': _percentile(ordered, 95) * 1000,
+        'p99_ms': _percentile(ordered, 99) * 1000,
+        'mean_ms': statistics.fmean(times) * 1000,
+        'throughput_per_s': len(times) / total if total else None,
+        'peak_rss_mib': peak_rss_mib(),
+    }
+
+
+def measure(fn, iterations):
+    # The first call is reported on its own: it includes model loading and cache warm-up
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return summarize(times, first)
+
+
+def _stage_functions(fixture):
+    # Returns the stage functions, caveats for stages whose timings do not reflect the real
+    # path, and a Counter of end-to-end runs by the stage that ended them ("none": not cut short)
+    id_bgr = cv2.cvtColor(fixture.id_rgb, cv2.COLOR_RGB2BGR)
+    document = normalize_document(ImageHandle(fixture.id_jpeg, target_side=engine.MAX_IMAGE_SIDE))
+    _, id_face = engine.face_region(document.view)
+    _, selfie_face = engine.face_region(fixture.selfie_rgb)
+    caveats = {}
+    if id_face is None or selfie_face is None:
+        # A --face photo the detector misses: the comparison is timed on fixed crops instead
+        caveats['compare'] = "no face detected in the fixture; timed on fixed crops"
+        id_face = id_face if id_face is not None else cv2.resize(id_bgr, (160, 192))
+        selfie_face = selfie_face if selfie_face is not None else cv2.resize(id_bgr, (160, 192))
+    embedder = get_embedder()
+    outcomes = Counter()
+    errors = {}
+
+    def compare():
+        vectors = embedder.embed([id_face, selfie_face])
+        return float(vectors[0] @ vectors[1])
+
+    def recv():
+        # Imported here: the webcam stack (av, streamlit-webrtc) is optional for the rest
+        from live_camera import VideoProcessor
+
+        processor = VideoProcessor()
+        frame = _Frame(cv2.resize(cv2.cvtColor(fixture.selfie_rgb, cv2.COLOR_RGB2BGR), (640, 480)))
+        processor.recv(frame)
+        return lambda: processor.recv(frame)
+
+    def end_to_end():
+        result = engine.verify(fixture.id_jpeg, fixture.selfie_jpeg)
+        outcomes[result.failed_stage or 'none'] += 1
+        for stage, message in result.errors.items():
+            errors.setdefault(stage, message)
+
+    functions = {
+        'decode': lambda: ImageHandle(fixture.id_jpeg, target_side=engine.MAX_IMAGE_SIDE).rgb,
+        'extract_dob': lambda: engine.extract_dob(fixture.ocr_lines),
+        'calculate_age': lambda: engine.calculate_age(fixture.dob),
+        'extract_face': lambda: engine.extract_face(id_bgr),
+        'check_image_quality': lambda: engine.check_image_quality(fixture.selfie_rgb),
+        'compare': compare,
+        'ocr': lambda: engine.read_dob_text(document.image),
+        'recv': recv,
+        'end_to_end': end_to_end,
+    }
+    return functions, caveats, (outcomes, errors)
+
+
+def _end_to_end_caveat(outcomes, errors):
+    runs = sum(outcomes.values())
+    cut = {stage: n for stage, n in outcomes.items() if stage != 'none'}
+    if not cut:
+        return None
+    caveat = f"{sum(cut.values())} of {runs} runs stopped early at {', '.join(sorted(cut))}"
+    if errors:
+        caveat += " (" + "; ".join(f"{stage}: {message}" for stage, message in sorted(errors.items())) + ")"
+    return caveat + "; timings cover the shortened path"
+
+
+def run(resolutions, stages, iterations, slow_iterations, face_rgb=None):
+    results = {}
+    for width in resolutions:
+        fixture = make_fixture(width, face_rgb)
+        functions, caveats, (outcomes, errors) = _stage_functions(fixture)
+        results[str(width)] = per_stage = {}
+        for name in stages:
+            fn = functions[name]
+            try:
+                if name == 'recv':
+                    fn = fn()
+                if name in ('ocr', 'end_to_end'):
+                    # Fail fast without EasyOCR or its weights instead of timing the error path
+                    engine.read_dob_text(np.full((32, 32, 3), 255, dtype=np.uint8))
+                per_stage[name] = measure(fn, slow_iterations if name in SLOW_STAGES else iterations)
+            except ImportError as e:
+                per_stage[name] = {'skipped': f"missing dependency: {e.name}"}
+            except FileNotFoundError as e:
+                per_stage[name] = {'skipped': f"missing model: {e}"}
+            stats = per_stage[name]
+            if name == 'end_to_end' and 'skipped' not in stats:
+                stats['failed_stage'] = dict(outcomes)
+                caveats['end_to_end'] = _end_to_end_caveat(outcomes, errors)
+            if caveats.get(name) and 'skipped' not in stats:
+                stats['caveat'] = caveats[name]
+            summary = f"{stats['p50_ms']:>10.2f} ms p50" if 'p50_ms' in stats else stats['skipped']
+            if 'caveat' in stats:
+                summary += f"  (!) {stats['caveat']}"
+            print(f"{width:>5}px {name:<20} {summary}", file=sys.stderr)
+    return results
+
+
+def _meta(args):
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'face_backend': get_embedder().name,
+        'stage_policy': engine.STAGE_POLICY,
+        'ocr_mode': engine.OCR_MODE,
+        'resolutions': args.resolutions,
+        'iterations': args.iterations,
+        'slow_iterations': args.slow_iterations,
+        'face_image': args.face,
+    }
+
+
+def compare_reports(baseline, current):
+    # Rows of (resolution, stage, baseline p50, current p50, ratio, flagged) for stages in both
+    # reports; flagged when either run carries a caveat and the ratio is not like for like
+    rows = []
+    for width, stages in current['results'].items():
+        for name, stats in stages.items():
+            before = baseline['results'].get(width, {}).get(name, {})
+            if 'p50_ms' in stats and 'p50_ms' in before:
+                flagged = 'caveat' in stats or 'caveat' in before
+                rows.append((width, name, before['p50_ms'], stats['p50_ms'], stats['p50_ms'] / before['p50_ms'], flagged))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every verification stage on synthetic fixtures")
+    parser.add_argument('--resolutions', type=int, nargs='+', default=[640, 1280, 2560], help="Photo widths")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--slow-iterations', type=int, default=3, help="Iterations for OCR and end-to-end")
+    parser.add_argument('--face', help="Face photo pasted into the fixtures (default: a drawn face)")
+    parser.add_argument('-o', '--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--compare', help="Earlier JSON report to compare p50 latencies against")
+    args = parser.parse_args(argv)
+
+    face_rgb = cv2.cvtColor(cv2.imread(args.face), cv2.COLOR_BGR2RGB) if args.face else None
+    report = {
+        'meta': _meta(args),
+        'results': run(args.resolutions, args.stages, args.iterations, args.slow_iterations, face_rgb),
+    }
+    report['meta']['peak_rss_mib'] = peak_rss_mib()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"{'width':>6} {'stage':<20}{'base p50':>12}{'p50':>12}{'ratio':>8}", file=sys.stderr)
+        for width, name, before, after, ratio, flagged in compare_reports(baseline, report):
+            mark = "  (!) caveat" if flagged else ""
+            print(f"{width:>6} {name:<20}{before:>12.2f}{after:>12.2f}{ratio:>8.2f}{mark}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
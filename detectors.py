@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+import cv2
+
+# Face detector model: a file name from cv2.data.haarcascades or a path (REALEYES_FACE_CASCADE)
+DEFAULT_FACE_CASCADE = os.environ.get("REALEYES_FACE_CASCADE", "haarcascade_frontalface_default.xml")
+
+
+# Helper: Resolve a cascade name to a file on disk
+def resolve_cascade_path(model):
+    if os.path.isfile(model):
+        return model
+    return os.path.join(cv2.data.haarcascades, model)
+
+
+# Loads each cascade XML once per process and hands out one compiled CascadeClassifier
+# per thread, since OpenCV cascades must not be shared between threads.
+class CascadeRegistry:
+    def __init__(self):
+        self._sources = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _stat(self, model):
+        return self._stats.setdefault(model, {
+            'hits': 0,
+            'instances': 0,
+            'file_load_seconds': 0.0,
+            'compile_seconds': 0.0,
+        })
+
+    def _source(self, model):
+        with self._lock:
+            source = self._sources.get(model)
+            if source is None:
+                start = time.perf_counter()
+                path = resolve_cascade_path(model)
+                with open(path, encoding="utf-8") as f:
+                    source = f.read()
+                self._sources[model] = source
+                self._stat(model)['file_load_seconds'] = time.perf_counter() - start
+            return source
+
+    def get(self, model=None):
+        model = model or DEFAULT_FACE_CASCADE
+        instances = getattr(self._local, 'instances', None)
+        if instances is None:
+            instances = self._local.instances = {}
+
+        cascade = instances.get(model)
+        if cascade is not None:
+            with self._lock:
+                self._stat(model)['hits'] += 1
+            return cascade
+
+        source = self._source(model)
+        start = time.perf_counter()
+        storage = cv2.FileStorage(source, cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+        cascade = cv2.CascadeClassifier()
+        if not cascade.read(storage.getFirstTopLevelNode()):
+            raise ValueError(f"Could not load face cascade: {model}")
+        elapsed = time.perf_counter() - start
+        instances[model] = cascade
+
+        with self._lock:
+            stat = self._stat(model)
+            stat['instances'] += 1
+            stat['compile_seconds'] += elapsed
+        return cascade
+
+    def stats(self):
+        with self._lock:
+            return {model: dict(stat) for model, stat in self._stats.items()}
+
+
+_registry = CascadeRegistry()
+
+
+# Helper: Face cascade for the calling thread
+def get_face_cascade(model=None):
+    return _registry.get(model)
+
+
+def detector_stats():
+    return _registry.stats()
@@ -0,0 +1,186 @@
+import math
+import re
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+
+# Labels that introduce a date of birth, in the languages our IDs come in
+DOB_LABELS = (
+    r'\bD\.?\s?O\.?\s?B\b', r'Birth', r'\bYOB\b', r'जन्म', r'Naissance', r'Geburt\w*', r'Nacimiento',
+    r'Nascimento', r'Nascita', r'Doğum',
+)
+# Labels of the other dates printed on IDs, which are usually the first date a naive scan finds
+OTHER_DATE_LABELS = (
+    r'Issue\w*', r'\bD\.?O\.?I\b', r'Expir\w*', r'Valid\w*', r'Download\w*', r'Print\w*', r'Emission',
+    r'Ausgestellt', r'Expedici[oó]n',
+)
+# \d also matches other scripts' digits (e.g. Devanagari), which int() converts
+DATE_FORMS = (
+    r'(?P<d>\d{1,2})[/.\-](?P<m>\d{1,2})[/.\-](?P<y>\d{4})',
+    r'(?P<iy>\d{4})[/.\-](?P<im>\d{1,2})[/.\-](?P<id>\d{1,2})',
+)
+# One scan per line finds every DOB label, other date label and date in order
+TOKEN_PATTERN = re.compile(
+    r'(?P<dob>{})|(?P<other>{})|(?P<date>(?<!\d){}(?!\d)|(?<!\d){}(?!\d))'.format(
+        '|'.join(DOB_LABELS), '|'.join(OTHER_DATE_LABELS), *DATE_FORMS
+    ),
+    re.IGNORECASE,
+)
+
+MAX_AGE_YEARS = 120
+
+
+# A date found in OCR output, with where it was read and how it ranks as the DOB
+@dataclass
+class DateCandidate:
+    text: str
+    value: date
+    confidence: float = 1.0
+    box: tuple = None
+    line: int = 0
+    dob_distance: float = math.inf      # to the nearest DOB label (0 = same line/box, right after it)
+    other_distance: float = math.inf    # to the nearest issue/expiry/... label that labels this date
+    plausible: bool = True
+
+    @property
+    def other_labelled(self):
+        # Closer to an issue/expiry/... label than to any DOB label
+        return self.other_distance < self.dob_distance
+
+    @property
+    def usable(self):
+        # Can be reported as the DOB: a possible birth date that is not labelled as another date
+        return self.plausible and not self.other_labelled
+
+    def rank(self):
+        # Lower sorts first: plausible, closer to a DOB label than to any other date label,
+        # nearest that label, earliest date (a DOB precedes issue dates), then OCR confidence
+        return (
+            not self.plausible,
+            self.other_labelled,
+            self.dob_distance,
+            self.value,
+            -self.confidence,
+        )
+
+
+# Helper: Parse a numeric date (day-first unless only month-first is valid); memoised, None if invalid
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    match = TOKEN_PATTERN.fullmatch(text.strip())
+    if match is None or match.group('date') is None:
+        return None
+    if match.group('y') is not None:
+        year, first, second = int(match.group('y')), int(match.group('d')), int(match.group('m'))
+        orders = ((first, second), (second, first))
+    else:
+        year = int(match.group('iy'))
+        orders = ((int(match.group('id')), int(match.group('im'))),)
+    for day, month in orders:
+        try:
+            return date(year, month, day)
+        except ValueError:
+            continue
+    return None
+
+
+# Helper: Kinds of token in a piece of OCR text: any of "dob" (label), "other" (label), "date"
+def token_kinds(text):
+    return {match.lastgroup if match.lastgroup in ('dob', 'other') else 'date' for match in TOKEN_PATTERN.finditer(text)}
+
+
+def _normalise(results):
+    # Plain strings (detail=0 / paragraph OCR) or (box, text, confidence) tuples -> tuples
+    for item in results:
+        if isinstance(item, str):
+            yield None, item, 1.0
+        else:
+            box, text, *rest = item
+            yield box, text, float(rest[0]) if rest else 1.0
+
+
+def _box_distance(a, b):
+    # Reading-order distance between boxes: vertical offsets count more than horizontal ones
+    ax, ay = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    bx, by = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    return abs(ax - bx) + 3 * abs(ay - by)
+
+
+def _labels(label_line, label_box, candidate):
+    # Whether a label can name this date: in the same text, in the box just above it or just
+    # before it on the same row, or (without boxes) on the line before it. A label further away
+    # names some other value, e.g. 'Valid throughout India' under an unlabelled date of birth.
+    if label_line == candidate.line:
+        return True
+    if label_box is None or candidate.box is None:
+        return label_line == candidate.line - 1
+    box = candidate.box
+    height = max(box[3] - box[1], label_box[3] - label_box[1], 1)
+    above = 0 <= box[1] - label_box[3] <= height and label_box[0] < box[2] and box[0] < label_box[2]
+    same_row = abs((box[1] + box[3]) - (label_box[1] + label_box[3])) <= height
+    before = same_row and 0 <= box[0] - label_box[2] <= 3 * height
+    return above or before
+
+
+# Helper: Every date in the OCR results, ranked most-likely DOB first
+def date_candidates(results, today=None):
+    today = today or date.today()
+    candidates, dob_labels, other_labels = [], [], []
+
+    for line, (box, text, confidence) in enumerate(_normalise(results)):
+        last_label = None
+        for match in TOKEN_PATTERN.finditer(text):
+            kind = match.lastgroup if match.lastgroup in ('dob', 'other') else 'date'
+            if kind == 'dob':
+                dob_labels.append((line, box))
+                last_label = 'dob'
+            elif kind == 'other':
+                other_labels.append((line, box))
+                last_label = 'other'
+            else:
+                value = parse_date(match.group('date'))
+                if value is None:
+                    continue
+                candidate = DateCandidate(match.group('date'), value, confidence, box, line)
+                candidate.plausible = today.year - MAX_AGE_YEARS <= value.year and value <= today
+                # A label earlier in the same text binds tightest
+                if last_label == 'dob':
+                    candidate.dob_distance = 0.0
+                elif last_label == 'other':
+                    candidate.other_distance = 0.0
+                candidates.append(candidate)
+
+    for candidate in candidates:
+        candidate.dob_distance = min(candidate.dob_distance, _label_distance(candidate, dob_labels))
+        near = [(line, box) for line, box in other_labels if _labels(line, box, candidate)]
+        candidate.other_distance = min(candidate.other_distance, _label_distance(candidate, near))
+    return sorted(candidates, key=DateCandidate.rank)
+
+
+def _label_distance(candidate, labels):
+    best = math.inf
+    for line, box in labels:
+        if line == candidate.line:
+            distance = 0.5      # label on the same line but after the date
+        elif box is not None and candidate.box is not None:
+            distance = 1.0 + _box_distance(box, candidate.box)
+        else:
+            distance = 1.0 + abs(line - candidate.line)
+        best = min(best, distance)
+    return best
+
+
+# Helper: Most likely DOB candidate in the OCR results, or None. Dates that cannot be a DOB
+# (in the future, too old) or that are labelled as issue/expiry dates are never returned.
+def best_dob(results, today=None):
+    candidates = date_candidates(results, today)
+    return candidates[0] if candidates and candidates[0].usable else None
+
+
+# Helper: Age in whole years on `today` for a DOB string, or None if it cannot be parsed or is in the future
+def age_from_dob(dob_str, today=None):
+    dob = parse_date(dob_str) if dob_str else None
+    today = today or date.today()
+    if dob is None or dob > today:
+        return None
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# Directory of the duplicate-identity face index; unset disables it (REALEYES_FACE_INDEX)
+DEFAULT_INDEX_DIR = os.environ.get("REALEYES_FACE_INDEX", "")
+
+SEARCH_BLOCK_ROWS = 65536       # rows scored per matrix product in exact search
+IVF_REBUILD_TAIL = 0.1          # re-sort the inverted lists once this share of rows was appended since
+
+
+# Helper: Merge a block's scores into the running top-k (scores and row numbers, best first)
+def _merge_top_k(best_scores, best_rows, scores, offset, k):
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        rows = part + offset
+    else:
+        rows = np.broadcast_to(np.arange(scores.shape[1]) + offset, scores.shape)
+    scores = np.concatenate([best_scores, scores], axis=1)
+    rows = np.concatenate([best_rows, rows], axis=1)
+    order = np.argsort(-scores, axis=1)[:, :k]
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+def _kmeans(sample, n_lists, iterations=10, seed=0):
+    # Spherical k-means: centroids stay unit length so assignment is a dot product
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        centroids[~empty] = sums[~empty] / norms[~empty]
+    return centroids
+
+
+# Append-only, memory-mapped index of unit-length float32 face embeddings with a label per row.
+# Exact search scores the rows block by block with one matrix product per block. After
+# train_ivf(), search(mode="ivf") only scores the rows in the nprobe closest inverted lists.
+#
+# Files in the index directory: meta.json (dim, count, label bytes, backend), vectors.f32 (count x dim),
+# labels.jsonl (one label per row) and, once trained, centroids.npy and assign.i32 (list per row).
+class EmbeddingIndex:
+    def __init__(self, path, dim=None, backend=None):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        meta_path = self._file('meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if dim is not None and dim != self.meta['dim']:
+                raise ValueError(f"Index {path} holds {self.meta['dim']}-d vectors, not {dim}-d")
+            if backend is not None and self.meta.get('backend') not in (None, backend):
+                raise ValueError(f"Index {path} was built with the {self.meta['backend']} backend, not {backend}")
+        else:
+            if dim is None:
+                raise ValueError(f"No index at {path}; pass dim to create one")
+            self.meta = {'dim': int(dim), 'count': 0, 'labels_bytes': 0, 'backend': backend}
+            self._write_meta()
+        self._open()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _write_meta(self):
+        tmp = self._file('meta.json.tmp')
+        with open(tmp, 'w', encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._file('meta.json'))
+
+    def _open(self):
+        # meta.json's counts are authoritative; data written after them by an interrupted append is ignored
+        self.labels = []
+        if self.meta['count']:
+            with open(self._file('labels.jsonl'), encoding="utf-8") as f:
+                for line, _ in zip(f, range(self.meta['count'])):
+                    self.labels.append(json.loads(line))
+        self.centroids = None
+        self._lists = None
+        if os.path.exists(self._file('centroids.npy')):
+            self.centroids = np.load(self._file('centroids.npy'))
+        self._map()
+
+    def _map(self):
+        count, dim = self.meta['count'], self.meta['dim']
+        self.vectors = (
+            np.memmap(self._file('vectors.f32'), dtype=np.float32, mode='r', shape=(count, dim))
+            if count else np.empty((0, dim), dtype=np.float32)
+        )
+        if self.centroids is not None:
+            self.assign = (
+                np.memmap(self._file('assign.i32'), dtype=np.int32, mode='r', shape=(count,))
+                if count else np.empty(0, dtype=np.int32)
+            )
+
+    def __len__(self):
+        return self.meta['count']
+
+    @property
+    def dim(self):
+        return self.meta['dim']
+
+    def _append(self, name, data, offset):
+        # Write at the committed end, dropping anything an interrupted append left behind
+        mode = 'r+b' if os.path.exists(self._file(name)) else 'w+b'
+        with open(self._file(name), mode) as f:
+            f.seek(offset)
+            f.truncate()
+            f.write(data)
+
+    def add(self, vectors, labels):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        labels = list(labels)
+        if len(labels) != len(vectors):
+            raise ValueError("Need one label per vector")
+        with self._lock:
+            count = self.meta['count']
+            labels_bytes = self.meta.get('labels_bytes', 0)
+            encoded = "".join(json.dumps(label) + "\n" for label in labels).encode("utf-8")
+            self._append('vectors.f32', vectors.tobytes(), count * self.dim * 4)
+            self._append('labels.jsonl', encoded, labels_bytes)
+            if self.centroids is not None:
+                assign = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+                self._append('assign.i32', assign.tobytes(), count * 4)
+            self.meta.update(count=count + len(vectors), labels_bytes=labels_bytes + len(encoded))
+            self._write_meta()
+            self.labels.extend(labels)
+            self._map()
+        return self.meta['count']
+
+    def train_ivf(self, n_lists=None, sample_size=None, iterations=10):
+        # Cluster the rows into n_lists inverted lists (default sqrt(count)), trained on a sample
+        with self._lock:
+            count = self.meta['count']
+            n_lists = min(count, n_lists or max(1, int(np.sqrt(count))))
+            sample_size = min(count, sample_size or 64 * n_lists)
+            rows = np.sort(np.random.default_rng(0).choice(count, sample_size, replace=False))
+            centroids = _kmeans(np.asarray(self.vectors[rows]), n_lists, iterations)
+
+            assign = np.empty(count, dtype=np.int32)
+            for start in range(0, count, SEARCH_BLOCK_ROWS):
+                block = self.vectors[start:start + SEARCH_BLOCK_ROWS]
+                assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            with open(self._file('assign.i32'), 'wb') as f:
+                f.write(assign.tobytes())
+            np.save(self._file('centroids.npy'), centroids)     # written last: its presence enables IVF
+            self.centroids = centroids
+            self._lists = None
+            self._map()
+            return n_lists
+
+    def _inverted_lists(self):
+        # Rows grouped by list (CSR) plus the rows appended since, which are scanned exhaustively
+        count = self.meta['count']
+        if self._lists is None or count - self._lists[2] > IVF_REBUILD_TAIL * max(1, self._lists[2]):
+            assign = np.asarray(self.assign)
+            order = np.argsort(assign, kind='stable').astype(np.int64)
+            offsets = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, offsets, count)
+        return self._lists
+
+    def search(self, queries, k=5, mode="exact", nprobe=8):
+        # Top-k (scores, rows) per query, best first; rows are -1 when fewer than k exist
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            vectors, count = self.vectors, self.meta['count']
+            best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+            if mode == "ivf" and self.centroids is not None:
+                order, offsets, indexed = self._inverted_lists()
+                probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+                results = []
+                for query, lists in zip(queries, probes):
+                    rows = np.concatenate(
+                        [order[offsets[c]:offsets[c + 1]] for c in lists] + [np.arange(indexed, count)]
+                    )
+                    rows.sort()     # sequential reads from the memmap
+                    scores = (vectors[rows] @ query)[None, :]
+                    s, r = _merge_top_k(best_scores[:1], best_rows[:1], scores, 0, k)
+                    missing = k - s.shape[1]
+                    results.append((
+                        np.pad(s[0], (0, missing), constant_values=-np.inf),
+                        np.pad(rows[r[0]], (0, missing), constant_values=-1),
+                    ))
+                best_scores = np.array([s for s, _ in results], dtype=np.float32).reshape(len(queries), k)
+                best_rows = np.array([r for _, r in results], dtype=np.int64).reshape(len(queries), k)
+            elif mode in ("exact", "ivf"):
+                for start in range(0, count, SEARCH_BLOCK_ROWS):
+                    scores = queries @ vectors[start:start + SEARCH_BLOCK_ROWS].T
+                    best_scores, best_rows = _merge_top_k(best_scores, best_rows, scores, start, k)
+            else:
+                raise ValueError(f"Unknown search mode: {mode}")
+
+        missing = k - best_scores.shape[1]
+        if missing > 0:
+            best_scores = np.pad(best_scores, ((0, 0), (0, missing)), constant_values=-np.inf)
+            best_rows = np.pad(best_rows, ((0, 0), (0, missing)), constant_values=-1)
+        return best_scores, best_rows
+
+    def lookup(self, query, k=5, min_score=None, mode="exact", nprobe=8):
+        # [(label, score)] for one query, best first, optionally above min_score
+        scores, rows = self.search(query, k, mode, nprobe)
+        return [
+            (self.labels[row], float(score))
+            for score, row in zip(scores[0], rows[0])
+            if row >= 0 and (min_score is None or score >= min_score)
+        ]
+
+    def search_or_add(self, vector, label, k=5, min_score=None, mode="exact", nprobe=8):
+        # lookup(), then add() under label when nothing scored min_score or better. Both run
+        # under the index lock, so concurrent callers with the same face cannot both miss it
+        # and both add it. Returns the matches found before adding.
+        with self._lock:
+            matches = self.lookup(vector, k, min_score, mode, nprobe)
+            if not matches:
+                self.add(np.reshape(vector, (1, -1)), [label])
+            return matches
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+# Helper: Process-wide index for a directory (REALEYES_FACE_INDEX by default), or None when unset
+def get_face_index(path=None, dim=None, backend=None):
+    path = path or DEFAULT_INDEX_DIR
+    if not path:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = EmbeddingIndex(path, dim, backend)
+        return index
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Face recognition ONNX model for the "dnn" backend, e.g. OpenCV Zoo's SFace (REALEYES_FACE_MODEL)
+DEFAULT_FACE_MODEL = os.environ.get("REALEYES_FACE_MODEL", "models/face_recognition_sface_2021dec.onnx")
+# Embedding backend: "dnn", "pixel", or empty for dnn when the model file exists (REALEYES_FACE_BACKEND)
+DEFAULT_BACKEND = os.environ.get("REALEYES_FACE_BACKEND", "")
+
+
+# Helper: L2-normalise rows so a dot product is the cosine similarity
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    return vectors / norms
+
+
+# Helper: Cosine similarities between every row of a and every row of b, as one matrix product
+def similarity_matrix(a, b):
+    return np.asarray(a, dtype=np.float32) @ np.asarray(b, dtype=np.float32).T
+
+
+# Baseline embedding that needs no model: the mean-centred gray pixels of the crop. The dot
+# product of two of these is the normalised correlation matchTemplate computed on equal-size crops.
+class PixelEmbedder:
+    name = 'pixel'
+    threshold = 0.35
+
+    def __init__(self, size=(64, 64)):
+        self.size = size
+        self.dim = size[0] * size[1]
+
+    def embed(self, faces):
+        if not faces:
+            return np.empty((0, self.dim), dtype=np.float32)
+        vectors = np.empty((len(faces), self.dim), dtype=np.float32)
+        for row, face in zip(vectors, faces):
+            gray = face if face.ndim == 2 else cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+            row[:] = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).ravel()
+            row -= row.mean()
+        return normalize_rows(vectors)
+
+
+# Face recogniser network run through OpenCV DNN. The ONNX file is read once per process;
+# each thread gets its own Net, since a Net must not run forward passes concurrently.
+class DnnEmbedder:
+    name = 'dnn'
+
+    def __init__(self, model_path=DEFAULT_FACE_MODEL, input_size=(112, 112), scale=1.0, mean=(0, 0, 0),
+                 swap_rb=True, threshold=0.363):
+        self.model_path = model_path
+        self.input_size = input_size
+        self.scale = scale
+        self.mean = mean
+        self.swap_rb = swap_rb
+        self.threshold = threshold      # SFace's published cosine threshold
+        start = time.perf_counter()
+        with open(model_path, 'rb') as f:
+            self._model = np.frombuffer(f.read(), dtype=np.uint8)
+        self.load_seconds = time.perf_counter() - start
+        self._local = threading.local()
+        self._batch_ok = True
+        self.dim = self.embed([np.zeros(input_size[::-1] + (3,), dtype=np.uint8)]).shape[1]
+
+    def _net(self):
+        net = getattr(self._local, 'net', None)
+        if net is None:
+            net = self._local.net = cv2.dnn.readNetFromONNX(self._model)
+        return net
+
+    def _forward(self, faces):
+        net = self._net()
+        blob = cv2.dnn.blobFromImages(faces, self.scale, self.input_size, self.mean, swapRB=self.swap_rb)
+        net.setInput(blob)
+        return net.forward().reshape(len(faces), -1)
+
+    def embed(self, faces):
+        if not faces:
+            return np.empty((0, getattr(self, 'dim', 0)), dtype=np.float32)
+        faces = [face if face.ndim == 3 else cv2.cvtColor(face, cv2.COLOR_GRAY2BGR) for face in faces]
+        if self._batch_ok and len(faces) > 1:
+            try:
+                return normalize_rows(self._forward(faces))
+            except cv2.error:
+                # Models exported with a fixed batch size of 1
+                self._batch_ok = False
+        return normalize_rows(np.vstack([self._forward([face]) for face in faces]))
+
+
+_backends = {
+    'pixel': PixelEmbedder,
+    'dnn': DnnEmbedder,
+}
+_embedders = {}
+_embedders_lock = threading.Lock()
+
+
+# Helper: Register an embedding backend; factory() returns an object with name, dim,
+# threshold and embed(list of BGR crops) -> (n, dim) float32 array of unit vectors
+def register_backend(name, factory):
+    _backends[name] = factory
+
+
+def _default_backend():
+    if DEFAULT_BACKEND:
+        return DEFAULT_BACKEND
+    return 'dnn' if os.path.isfile(DEFAULT_FACE_MODEL) else 'pixel'
+
+
+# Helper: Process-wide embedder for a backend, created (and its model loaded) on first use
+def get_embedder(backend=None):
+    backend = backend or _default_backend()
+    with _embedders_lock:
+        embedder = _embedders.get(backend)
+        if embedder is None:
+            if backend not in _backends:
+                raise ValueError(f"Unknown face embedding backend: {backend}")
+            embedder = _embedders[backend] = _backends[backend]()
+        return embedder
+
+
+# Helper: Cosine similarity of two BGR face crops
+def face_similarity(face1, face2, embedder=None):
+    vectors = (embedder or get_embedder()).embed([face1, face2])
+    return float(vectors[0] @ vectors[1])
@@ -0,0 +1,602 @@
+# UI-free verification engine. Only cv2/numpy are imported up front; EasyOCR (and torch)
+# load on the first OCR call, so importing this module stays cheap for batch jobs and services.
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from detectors import get_face_cascade
+from dob import age_from_dob, best_dob, parse_date, token_kinds
+from embedding_index import get_face_index
+from embeddings import face_similarity, get_embedder
+from images import MAX_IMAGE_SIDE, as_image_handle, clamp_handle, normalize_document
+from memory import (
+    MemoryBudgetExceeded, estimate_verification_bytes, get_buffer_pool, get_memory_budget, track, working_side,
+)
+from metrics import observe, span
+from ocr import box_bounds, detect_text_boxes, get_reader_pool, recognize_boxes
+from ocr_batching import OCR_BATCHING, get_ocr_batcher
+from pipeline import StageGraph
+
+# Decision thresholds shared by the UI and headless runners (the match threshold comes
+# from the face embedding backend)
+LIVE_CAMERA_THRESHOLD_OFFSET = 0.05
+ADULT_AGE = 18
+DUPLICATE_TOP_K = 5                 # nearest indexed faces checked for another ID with the same face
+OCR_LANGUAGES = ('en',)
+# "regions" reads the boxes around DOB labels first and falls back to full OCR; "full" always reads everything
+OCR_MODE = os.environ.get("REALEYES_OCR_MODE", "regions")
+# "cheap-first" runs the gates below before OCR and stops at the first that fails; "parallel"
+# starts OCR straight away alongside face detection (REALEYES_STAGE_POLICY)
+STAGE_POLICY = os.environ.get("REALEYES_STAGE_POLICY", "cheap-first")
+# Cheap checks that can reject a submission before OCR: "size", "face", "quality" (REALEYES_GATES)
+GATES = tuple(g.strip() for g in os.environ.get("REALEYES_GATES", "size,face").split(",") if g.strip())
+MIN_IMAGE_SIDE = 200                # smaller uploads cannot hold a readable DOB or a usable face
+
+# Region OCR box selection, in estimated characters (box width / height / CHAR_ASPECT)
+CHAR_ASPECT = 0.6                   # glyph advance relative to the text box height
+DATE_CHARS = 12                     # a bare date or a short label ("DOB", "जन्म तिथि")
+DATE_LINE_CHARS = 40                # a label and its date on one line, bilingual labels included
+NEIGHBOUR_LINES = 4                 # how far (in line heights) beside a label its date may be printed
+
+
+# Raised by a gate stage; stages that depend on the gate are skipped
+class StageRejected(Exception):
+    def __init__(self, stage, reason):
+        super().__init__(reason)
+        self.stage = stage
+
+
+# Outcome of one ID + selfie verification; face crops are BGR arrays
+@dataclass
+class VerificationResult:
+    dob: str = None
+    dob_confidence: float = None
+    age: int = None
+    id_face: np.ndarray = field(default=None, repr=False)
+    selfie_face: np.ndarray = field(default=None, repr=False)
+    id_face_box: tuple = None
+    face_backend: str = None
+    similarity_score: float = None
+    duplicates: list = field(default_factory=list)     # (other identity label, similarity) pairs
+    threshold: float = None
+    match: bool = False
+    age_passed: bool = False
+    quality: dict = None
+    failed_stage: str = None
+    errors: dict = field(default_factory=dict)
+    timings_ms: dict = field(default_factory=dict)
+
+    @property
+    def approved(self):
+        return self.match and self.age_passed and not self.duplicates
+
+    @property
+    def decision(self):
+        return "APPROVED" if self.approved else "REJECTED"
+
+    @property
+    def similarity_percent(self):
+        if self.similarity_score is None:
+            return None
+        return max(0, self.similarity_score * 100)
+
+    def to_dict(self):
+        data = asdict(self)
+        del data['id_face'], data['selfie_face']
+        data.update(
+            id_face_found=self.id_face is not None,
+            selfie_face_found=self.selfie_face is not None,
+            decision=self.decision,
+            similarity_percent=self.similarity_percent,
+        )
+        return data
+
+
+# Helper: Decode an upload (bytes, path, file-like, ImageHandle or RGB array) to an RGB array, EXIF-aware
+def decode_image(source):
+    return as_image_handle(source).rgb
+
+
+# Helper: Content digest used to key cached stages for an input
+def image_digest(source):
+    return as_image_handle(source).digest
+
+
+# Helper: Run OCR on an RGB image with a pooled EasyOCR reader; returns (box, text, confidence) tuples
+def read_text(img, languages=OCR_LANGUAGES):
+    if OCR_BATCHING:
+        return get_ocr_batcher(languages).read(img)
+    with get_reader_pool(languages).reader() as reader:
+        return [(box_bounds(points), text, float(confidence)) for points, text, confidence in reader.readtext(img, detail=1)]
+
+
+# Helper: Estimated number of characters in an (x0, y0, x1, y1) text box
+def estimated_chars(box):
+    x0, y0, x1, y1 = box
+    return (x1 - x0) / max(1, y1 - y0) / CHAR_ASPECT
+
+
+# Helper: Boxes of at most max_chars characters that are not headline-tall
+def date_shaped_boxes(boxes, max_chars=DATE_CHARS):
+    if not boxes:
+        return []
+    heights = sorted(y1 - y0 for _, y0, _, y1 in boxes)
+    max_height = 2 * heights[len(heights) // 2]
+    return [box for box in boxes if 0 < box[3] - box[1] <= max_height and estimated_chars(box) <= max_chars]
+
+
+# Helper: Boxes where the value of an anchor (a label or a date) can be printed: on the same
+# line within NEIGHBOUR_LINES line heights, or on the line just above or below in the same column
+def neighbour_boxes(anchors, boxes):
+    found = []
+    for ax0, ay0, ax1, ay1 in anchors:
+        line = max(1, ay1 - ay0)
+        for box in boxes:
+            x0, y0, x1, y1 = box
+            same_line = min(ay1, y1) - max(ay0, y0) >= 0.5 * min(line, y1 - y0)
+            beside = x0 - ax1 <= NEIGHBOUR_LINES * line and ax0 - x1 <= NEIGHBOUR_LINES * line
+            adjacent_line = -0.5 * line <= y0 - ay1 <= line or -0.5 * line <= ay0 - y1 <= line
+            same_column = min(ax1, x1) > max(ax0, x0)
+            if ((same_line and beside) or (adjacent_line and same_column)) and box not in found:
+                found.append(box)
+    return found
+
+
+# Helper: OCR only the boxes likely to hold the DOB or its label; returns their
+# (box, text, confidence) results, or None unless they give a usable date tied to a DOB label
+def read_dob_regions(img, languages=OCR_LANGUAGES):
+    if OCR_BATCHING:
+        batcher = get_ocr_batcher(languages)
+        detected = []
+        # Detection only (nothing selected for recognition), batched with other verifications
+        batcher.read(img, select=lambda boxes: detected.extend(boxes) or [])
+        return _read_dob_tiers(detected, lambda boxes: batcher.read(img, boxes=boxes))
+    with get_reader_pool(languages).reader() as reader:
+        return _read_dob_tiers(detect_text_boxes(reader, img), lambda boxes: recognize_boxes(reader, img, boxes))
+
+
+def _read_dob_tiers(boxes, recognise):
+    # Widen the selection only while no anchored DOB has been read, recognising each box once:
+    # bare dates and short labels, then the neighbours of the labels and dates read so far,
+    # then whole "label: date" lines
+    results, read = [], set()
+    tiers = (
+        lambda: date_shaped_boxes(boxes),
+        lambda: neighbour_boxes([box for box, text, _ in results if token_kinds(text) & {'dob', 'date'}], boxes),
+        lambda: date_shaped_boxes(boxes, DATE_LINE_CHARS),
+    )
+    for tier in tiers:
+        new = [box for box in tier() if box not in read]
+        if new:
+            read.update(new)
+            results.extend(recognise(new))
+            candidate = best_dob(results)
+            if candidate is not None and candidate.dob_distance < math.inf:
+                return results
+    return None
+
+
+# Helper: OCR results for DOB extraction, using region OCR first when enabled
+def read_dob_text(img, languages=OCR_LANGUAGES, mode=OCR_MODE):
+    if mode == "regions":
+        results = read_dob_regions(img, languages)
+        if results:
+            return results
+    return read_text(img, languages)
+
+
+# Helper: Extract DOB from OCR output (text lines or (box, text, confidence) tuples)
+def extract_dob(text_lines):
+    candidate = best_dob(text_lines)
+    return candidate.text if candidate else None
+
+# Helper: Calculate age from DOB string
+def calculate_age(dob_str):
+    return age_from_dob(dob_str)
+
+# Helper: Extract face from image using OpenCV
+def extract_face(img):
+    box = detect_face_box(img)
+    if box is None:
+        return None
+    x1, y1, x2, y2 = box
+    return img[y1:y2, x1:x2]
+
+# Helper: Largest face in a BGR image as (x1, y1, x2, y2) including a 20% margin
+def detect_face_box(img, gray=None):
+    face_cascade = get_face_cascade()
+    if gray is None:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    with span('face_detect'):
+        faces = face_cascade.detectMultiScale(gray, 1.1, 4, minSize=(50, 50))
+    
+    if len(faces) > 0:
+        # Get the largest face
+        (x, y, w, h) = max(faces, key=lambda face: face[2] * face[3])
+        margin = int(0.2 * w)
+        x1 = max(0, x - margin)
+        y1 = max(0, y - margin)
+        x2 = min(img.shape[1], x + w + margin)
+        y2 = min(img.shape[0], y + h + margin)
+        return (int(x1), int(y1), int(x2), int(y2))
+    return None
+
+# Helper: (box, BGR crop) of the largest face in an RGB image or ImageHandle, or (None, None)
+def face_region(image):
+    handle = as_image_handle(image)
+    box = detect_face_box(handle.bgr, handle.gray)
+    if box is None:
+        return None, None
+    x1, y1, x2, y2 = box
+    # A copy, so the crop does not keep the whole BGR image alive
+    return box, handle.bgr[y1:y2, x1:x2].copy()
+
+# Helper: Compare two BGR face crops; cosine similarity of their embeddings
+def compare_faces(face1, face2, embedder=None):
+    return face_similarity(face1, face2, embedder)
+
+# Helper: Check image quality for selfies (RGB array, or gray passed in when already known)
+def check_image_quality(img, gray=None):
+    quality_checks = {
+        'blur_score': 0,
+        'brightness_score': 0,
+        'contrast_score': 0,
+        'face_centered': False,
+        'face_size_ok': False,
+        'overall_quality': 'Poor'
+    }
+    
+    if gray is None:
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    
+    # Blur detection using Laplacian variance. The Laplacian of uint8 input fits in int16
+    # exactly; it goes into a pooled buffer instead of a fresh float64 image.
+    with get_buffer_pool().borrow(gray.shape, np.int16) as laplacian:
+        cv2.Laplacian(gray, cv2.CV_16S, dst=laplacian)
+        _, lap_std = cv2.meanStdDev(laplacian)
+    blur_score = float(lap_std[0, 0]) ** 2
+    quality_checks['blur_score'] = blur_score
+    
+    # Brightness and contrast analysis in one pass, without a float copy of the image
+    mean, std = cv2.meanStdDev(gray)
+    brightness = float(mean[0, 0])
+    quality_checks['brightness_score'] = brightness
+    contrast = float(std[0, 0])
+    quality_checks['contrast_score'] = contrast
+    
+    # Face detection and positioning
+    face_cascade = get_face_cascade()
+    faces = face_cascade.detectMultiScale(gray, 1.2, 5)
+    
+    if len(faces) > 0:
+        (x, y, w, h) = max(faces, key=lambda face: face[2] * face[3])
+        img_center_x = img.shape[1] // 2
+        img_center_y = img.shape[0] // 2
+        face_center_x = x + w // 2
+        face_center_y = y + h // 2
+        
+        center_tolerance_x = img.shape[1] * 0.25
+        center_tolerance_y = img.shape[0] * 0.25
+        
+        quality_checks['face_centered'] = (
+            abs(face_center_x - img_center_x) < center_tolerance_x and
+            abs(face_center_y - img_center_y) < center_tolerance_y
+        )
+        
+        min_face_size = img.shape[1] * 0.15
+        quality_checks['face_size_ok'] = w > min_face_size
+    
+    # Overall quality assessment
+    quality_checks['overall_quality'] = overall_quality(
+        blur_score, brightness, contrast, quality_checks['face_centered'], quality_checks['face_size_ok']
+    )
+    
+    return quality_checks
+
+# Helper: Overall quality label from the individual quality checks
+def overall_quality(blur_score, brightness, contrast, face_centered, face_size_ok):
+    blur_ok = blur_score > 100
+    brightness_ok = 50 < brightness < 200
+    contrast_ok = contrast > 20
+    
+    score = 0
+    if blur_ok: score += 25
+    if brightness_ok: score += 25
+    if contrast_ok: score += 15
+    if face_centered: score += 20
+    if face_size_ok: score += 15
+    
+    if score >= 85:
+        return 'Excellent'
+    elif score >= 65:
+        return 'Good'
+    elif score >= 45:
+        return 'Fair'
+    return 'Poor'
+
+# Helper: Whether the quality checks are good enough to capture a selfie
+def capture_ready(quality_checks):
+    return (
+        quality_checks['face_centered'] and
+        quality_checks['face_size_ok'] and
+        quality_checks['blur_score'] > 100 and
+        50 < quality_checks['brightness_score'] < 200
+    )
+
+# Helper: Similarity threshold for a selfie source and embedding backend
+def match_threshold(live_capture=False, embedder=None):
+    threshold = (embedder or get_embedder()).threshold
+    if live_capture:  # Live camera usually has better quality
+        return threshold - LIVE_CAMERA_THRESHOLD_OFFSET
+    return threshold
+
+
+def _decoded(prepared):
+    # Create the views the stages read before a working copy is cached, so the cache
+    # accounts for its full size
+    working = prepared.view if hasattr(prepared, 'view') else prepared
+    working.rgb, working.bgr, working.gray
+    return prepared
+
+
+def _released(prepared, source):
+    # The upload's decoded views are dropped as soon as a smaller working copy replaces them
+    working = prepared.view if hasattr(prepared, 'view') else prepared
+    if working is not source:
+        source.release()
+    return prepared
+
+
+def _when_done(futures, callback):
+    futures = list(futures)
+    remaining = {'count': len(futures)}
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining['count'] -= 1
+            last = remaining['count'] == 0
+        if last:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+# Gate: both uploads are large enough to verify
+def check_size(doc, selfie):
+    for name, handle in (('ID', doc.source), ('selfie', selfie)):
+        width, height = handle.full_size
+        if min(width, height) < MIN_IMAGE_SIDE:
+            raise StageRejected('size', f"The {name} image is {width}x{height}; at least {MIN_IMAGE_SIDE}px per side is needed")
+
+
+# Gate: a face was found on both the ID and the selfie
+def check_faces(id_face, selfie_face):
+    missing = [name for name, (_, crop) in (('government ID', id_face), ('selfie', selfie_face)) if crop is None]
+    if missing:
+        raise StageRejected('face', f"Could not detect faces in: {', '.join(missing)}")
+
+
+# Gate: the selfie is not of poor quality
+def check_quality(quality):
+    if quality['overall_quality'] == 'Poor':
+        raise StageRejected('quality', "The selfie is too blurry, dark or off-centre to verify")
+
+
+def _value(future):
+    # Result of a finished stage, or None if it failed or is still running
+    if future.done() and not future.cancelled() and future.exception() is None:
+        return future.result()
+    return None
+
+
+# Helper: Duplicate-identity index for the current embedding backend, or None when REALEYES_FACE_INDEX is unset
+def default_face_index():
+    embedder = get_embedder()
+    return get_face_index(dim=embedder.dim, backend=embedder.name)
+
+
+# Helper: Index label for an ID: the identity it claims (its DOB, the only identity field the
+# pipeline reads) and the upload's digest, which traces a match back to its submission
+def identity_label(dob, digest):
+    value = parse_date(dob)
+    return {'dob': value.isoformat() if value else dob, 'id': digest}
+
+
+def _same_identity(a, b):
+    # Rows written before labels carried the DOB are plain digests
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a['dob'] == b['dob']
+    return a == b
+
+
+# Helper: Identities in the index whose face matches this ID's face embedding. A match with the
+# same identity is the same person re-verifying (say, with a new photo of the card) and is not
+# a duplicate. A face with no match is added under its label, so later uploads of it with
+# another identity are caught.
+def register_identity(index, vector, label, threshold, k=DUPLICATE_TOP_K):
+    matches = index.search_or_add(vector, label, k, min_score=threshold)
+    return [(other, score) for other, score in matches if not _same_identity(other, label)]
+
+
+# Run the full pipeline: cheap gates -> OCR -> DOB/age, face extraction -> comparison -> decision.
+# The result reports the first stage that made it final (a gate, DOB, faces, comparison). When a
+# StageCache is passed, every stage is memoised on the content digests of the inputs. When an
+# EmbeddingIndex is passed, approved ID faces are checked against (and added to) it.
+def verify(id_image, selfie_image, live_capture=False, cache=None, languages=OCR_LANGUAGES, index=None,
+           policy=None, gates=None, executor=None):
+    started = time.perf_counter()
+    result = VerificationResult()
+    timings = {}
+    # Each input is decoded at most once; its RGB/BGR/gray views are shared by every stage
+    id_handle = as_image_handle(id_image, target_side=MAX_IMAGE_SIDE)
+    selfie_handle = as_image_handle(selfie_image, target_side=MAX_IMAGE_SIDE)
+    policy = policy or STAGE_POLICY
+    gates = (GATES if gates is None else gates) if policy == "cheap-first" else ()
+
+    # Memory is planned from the image headers: the working resolution is lowered until the
+    # estimate fits the per-verification budget, which is then reserved from the process budget
+    full_sizes, decode_sizes = zip(id_handle.probe(), selfie_handle.probe())
+    max_side = working_side(full_sizes, MAX_IMAGE_SIDE, decode_sizes=decode_sizes)
+    # Every cached stage derives from the working copies, so the keys carry their resolution:
+    # a copy cached at 1600 px is not reused when the budget calls for a smaller one
+    id_key = (id_handle.digest, max_side) if cache is not None else None
+    selfie_key = (selfie_handle.digest, max_side) if cache is not None else None
+    budget = get_memory_budget()
+    reserved = 0
+    if budget is not None:
+        try:
+            reserved = budget.acquire(estimate_verification_bytes(full_sizes, max_side, decode_sizes))
+        except MemoryBudgetExceeded as e:
+            result.failed_stage = 'memory'
+            result.errors['memory'] = str(e)
+            return result
+
+    def stage(name, key, fn, label=None):
+        start = time.perf_counter()
+        with track(label or name):
+            if cache is None:
+                value = fn()
+            else:
+                value = cache.get_or_compute(name, key, fn)
+        elapsed = time.perf_counter() - start
+        timings[label or name] = round(elapsed * 1000, 2)
+        observe(label or name, elapsed)
+        return value
+
+    def gate(name, check):
+        # A disabled gate passes straight through
+        return (lambda *values: check(*values) if name in gates else None)
+
+    def embed(id_face, selfie_face):
+        # Both crops are embedded in one batch; the similarity is their dot product
+        if id_face[1] is None or selfie_face[1] is None:
+            return None
+        embedder = get_embedder()
+        vectors = stage('embed', (id_key, selfie_key, embedder.name),
+                        lambda: embedder.embed([id_face[1], selfie_face[1]]), 'compare')
+        return embedder, vectors
+
+    # Stages form a dependency graph. Face detection on both images runs concurrently, and
+    # under "cheap-first" OCR (by far the most expensive stage) only starts once the cheap
+    # gates have passed; a failed gate skips every stage after it. The ID is clamped, cropped
+    # to the card and perspective-corrected once for OCR and face detection.
+    graph = StageGraph(executor)
+    graph.add('document', lambda: stage(
+        'document', id_key, lambda: _decoded(_released(normalize_document(id_handle, max_side), id_handle)),
+        'decode_id'))
+    graph.add('selfie', lambda: stage(
+        'selfie', selfie_key, lambda: _released(_decoded(clamp_handle(selfie_handle, max_side)), selfie_handle),
+        'decode_selfie'))
+    graph.add('gate_size', gate('size', check_size), after=('document', 'selfie'))
+    graph.add('quality', lambda selfie, _: stage(
+        'quality', selfie_key, lambda: check_image_quality(selfie.rgb, selfie.gray)), after=('selfie', 'gate_size'))
+    graph.add('face_id', lambda doc, _: stage(
+        'face_id', id_key, lambda: face_region(doc.view)), after=('document', 'gate_size'))
+    graph.add('face_selfie', lambda selfie, _: stage(
+        'face_selfie', selfie_key, lambda: face_region(selfie)), after=('selfie', 'gate_size'))
+    graph.add('gate_face', gate('face', check_faces), after=('face_id', 'face_selfie'))
+    graph.add('gate_quality', gate('quality', check_quality), after=('quality',))
+    graph.add('text', lambda doc, *_: stage(
+        'readtext', (id_key, tuple(languages), OCR_MODE), lambda: read_dob_text(doc.view.rgb, languages)),
+        after=('document', 'gate_face', 'gate_quality') if gates else ('document',))
+    graph.add('dob', lambda text: stage('dob', id_key, lambda: best_dob(text)), after=('text',))
+    graph.add('embed', embed, after=('face_id', 'face_selfie'))
+    stages = graph.run()
+
+    def finished():
+        # Once every stage is done (including any still running after an early exit) the
+        # decoded views are dropped and the reservation is returned. Working copies held by
+        # the cache keep their views: later hits and concurrent verifications share them.
+        document, selfie = _value(stages['document']), _value(stages['selfie'])
+        working = (document.view if document else None, selfie)
+        cached = {id(handle) for handle in working if handle is not None} if cache is not None else set()
+        for handle in (*working, id_handle, selfie_handle):
+            if handle is not None and id(handle) not in cached:
+                handle.release()
+        if reserved:
+            budget.release(reserved)
+
+    _when_done(stages.values(), finished)
+
+    try:
+        _collect(result, stages, stage, timings, live_capture, index, id_handle)
+    finally:
+        # The decision is final: stages that have not started are skipped, and stages still
+        # running after an early exit keep their timings to themselves
+        graph.cancel()
+        result.timings_ms = dict(timings)
+        observe('verify', time.perf_counter() - started)
+    return result
+
+
+def _collect(result, stages, stage, timings, live_capture, index, id_handle):
+    # Read the stage results in decision order, stopping as soon as the decision is final
+    try:
+        for name in ('gate_size', 'gate_face', 'gate_quality'):
+            stages[name].result()
+    except StageRejected as e:
+        result.failed_stage = e.stage
+        result.errors[e.stage] = str(e)
+        result.quality = _value(stages['quality'])
+        result.id_face = (_value(stages['face_id']) or (None, None))[1]
+        result.selfie_face = (_value(stages['face_selfie']) or (None, None))[1]
+        return
+
+    id_doc = stages['document'].result()
+    result.quality = stages['quality'].result()
+    try:
+        candidate = stages['dob'].result()
+        if candidate is not None:
+            result.dob, result.dob_confidence = candidate.text, candidate.confidence
+    except Exception as e:
+        result.errors['ocr'] = str(e)
+    if not result.dob:
+        result.failed_stage = 'dob'
+        return
+
+    result.age = stage('age', (result.dob, datetime.today().date()), lambda: calculate_age(result.dob))
+    result.age_passed = result.age is not None and result.age >= ADULT_AGE
+
+    id_face, selfie_face = stages['face_id'].result(), stages['face_selfie'].result()
+    (id_box, result.id_face), (_, result.selfie_face) = id_face, selfie_face
+    if id_box is not None:
+        # Location on the uploaded photo, for callers that need a full-resolution crop
+        result.id_face_box = id_doc.to_original_box(id_box)
+    try:
+        # Only fails with the face gate off; the rejection then reads as the gate's would
+        check_faces(id_face, selfie_face)
+    except StageRejected as e:
+        result.failed_stage = e.stage
+        result.errors[e.stage] = str(e)
+        return
+
+    try:
+        embedder, vectors = stages['embed'].result()
+        result.face_backend = embedder.name
+        result.similarity_score = float(vectors[0] @ vectors[1])
+    except Exception as e:
+        result.errors['compare'] = str(e)
+        result.failed_stage = 'compare'
+        return
+
+    result.threshold = match_threshold(live_capture, embedder)
+    result.match = result.similarity_score > result.threshold
+
+    # The index is only consulted when nothing else has already rejected the submission
+    if index is not None and result.approved:
+        start = time.perf_counter()
+        label = identity_label(result.dob, id_handle.digest)
+        result.duplicates = register_identity(index, vectors[0], label, embedder.threshold)
+        elapsed = time.perf_counter() - start
+        timings['duplicates'] = round(elapsed * 1000, 2)
+        observe('duplicates', elapsed)
+        if result.duplicates:
+            result.failed_stage = 'duplicate'
@@ -0,0 +1,112 @@
+from detectors import get_face_cascade
+
+# Tracking tuning
+TRACK_MARGIN = 0.5          # ROI grows by this fraction of the face size on every side
+REDETECT_INTERVAL = 30      # tracked updates before a full-frame scan is forced
+MIN_CONFIDENCE = 0.5        # below this the tracker falls back to full-frame scans
+SMOOTHING = 0.5             # weight of the new box when blending with the previous one
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def _largest(faces):
+    if len(faces) == 0:
+        return None
+    return tuple(int(v) for v in max(faces, key=lambda face: face[2] * face[3]))
+
+
+# Track-then-detect face locator for a stream of grayscale frames. While confidence is
+# high it only searches a region around the previous box, at face sizes near the last
+# one; a miss, low confidence or the periodic re-detect triggers a full-frame scan.
+class FaceTracker:
+    def __init__(self, scale_factor=1.2, min_neighbors=5, margin=TRACK_MARGIN,
+                 redetect_interval=REDETECT_INTERVAL, min_confidence=MIN_CONFIDENCE, smoothing=SMOOTHING):
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.margin = margin
+        self.redetect_interval = redetect_interval
+        self.min_confidence = min_confidence
+        self.smoothing = smoothing
+        self.box = None
+        self.confidence = 0.0
+        self.full_scans = 0
+        self.tracked_updates = 0
+        self._since_full = 0
+
+    def reset(self):
+        self.box = None
+        self.confidence = 0.0
+        self._since_full = 0
+
+    def _search_roi(self, gray):
+        x, y, w, h = self.box
+        mx, my = int(w * self.margin), int(h * self.margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(gray.shape[1], x + w + mx), min(gray.shape[0], y + h + my)
+        roi = gray[y0:y1, x0:x1]
+
+        min_side = max(1, int(min(w, h) * 0.7))
+        max_side = int(max(w, h) * 1.4)
+        if roi.shape[0] < min_side or roi.shape[1] < min_side:
+            return None
+        faces = get_face_cascade().detectMultiScale(
+            roi, self.scale_factor, self.min_neighbors,
+            minSize=(min_side, min_side), maxSize=(max_side, max_side)
+        )
+        box = _largest(faces)
+        if box is None:
+            return None
+        return (box[0] + x0, box[1] + y0, box[2], box[3])
+
+    def _full_scan(self, gray):
+        self.full_scans += 1
+        self._since_full = 0
+        return _largest(get_face_cascade().detectMultiScale(gray, self.scale_factor, self.min_neighbors))
+
+    def _smooth(self, box):
+        if self.box is None or _iou(self.box, box) < 0.3:
+            return box
+        a = self.smoothing
+        return tuple(int(round(p + a * (n - p))) for p, n in zip(self.box, box))
+
+    def update(self, gray):
+        tracking = (
+            self.box is not None
+            and self.confidence >= self.min_confidence
+            and self._since_full < self.redetect_interval
+        )
+        if tracking:
+            self.tracked_updates += 1
+            self._since_full += 1
+            box = self._search_roi(gray)
+            if box is not None:
+                overlap = _iou(self.box, box)
+                self.confidence = 0.7 * self.confidence + 0.3 * (1.0 if overlap > 0.3 else 0.5)
+                self.box = self._smooth(box)
+                return self.box
+            self.confidence *= 0.5
+
+        # Lost, unsure or due for a periodic re-detect: scan the whole frame
+        box = self._full_scan(gray)
+        if box is None:
+            self.box = None
+            self.confidence = 0.0
+            return None
+        self.box = self._smooth(box)
+        self.confidence = 1.0
+        return self.box
+
+    def stats(self):
+        return {
+            'confidence': self.confidence,
+            'full_scans': self.full_scans,
+            'tracked_updates': self.tracked_updates,
+        }
@@ -0,0 +1,55 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+
+# Helper: Rank a live frame for selfie capture from its quality metrics (-inf when not usable)
+def frame_score(metrics, ready):
+    if not ready or metrics['face_box'] is None:
+        return -math.inf
+    _, _, w, _ = metrics['face_box']
+    # Sharpness dominates; a bigger face and lighting near mid-range break ties
+    lighting = 1.0 - abs(metrics['brightness_score'] - 125.0) / 125.0
+    return math.log1p(metrics['blur_score']) + 0.5 * lighting + 0.002 * w
+
+
+# Fixed-size ring of recent BGR frames with their scores. Storage is allocated once (and
+# again only if the camera resolution changes), so pushing a frame is a single copy.
+class FrameRingBuffer:
+    def __init__(self, capacity, frame_shape=(480, 640, 3)):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._allocate(frame_shape)
+
+    def _allocate(self, frame_shape):
+        self.frames = np.empty((self.capacity,) + tuple(frame_shape), dtype=np.uint8)
+        self.scores = np.full(self.capacity, -np.inf)
+        self.timestamps = np.zeros(self.capacity)
+        self._next = 0
+
+    def push(self, frame, score, timestamp=None):
+        with self._lock:
+            if frame.shape != self.frames.shape[1:]:
+                self._allocate(frame.shape)
+            slot = self._next
+            np.copyto(self.frames[slot], frame)
+            self.scores[slot] = score
+            self.timestamps[slot] = time.time() if timestamp is None else timestamp
+            self._next = (slot + 1) % self.capacity
+
+    def best(self, window_seconds, now=None):
+        # Copy of the highest scoring frame pushed within the window, or None
+        now = time.time() if now is None else now
+        with self._lock:
+            scores = np.where(self.timestamps >= now - window_seconds, self.scores, -np.inf)
+            slot = int(np.argmax(scores))
+            if not np.isfinite(scores[slot]):
+                return None, None
+            return self.frames[slot].copy(), float(scores[slot])
+
+    def clear(self):
+        with self._lock:
+            self.scores.fill(-np.inf)
+            self.timestamps.fill(0)
@@ -0,0 +1,259 @@
+import io
+import math
+import os
+import threading
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from metrics import span
+from result_cache import content_digest
+
+# Longest side images are clamped to before OCR and face detection (REALEYES_MAX_IMAGE_SIDE)
+MAX_IMAGE_SIDE = int(os.environ.get("REALEYES_MAX_IMAGE_SIDE", "1600"))
+# Detect the ID card outline and correct its perspective (REALEYES_CARD_CROP=0 to disable)
+CARD_CROP = os.environ.get("REALEYES_CARD_CROP", "1") != "0"
+
+CARD_SEARCH_SIDE = 640          # the outline is searched on a copy this size
+CARD_MIN_AREA = 0.3             # outline must cover at least this share of the photo
+CARD_FULL_FRAME = 0.95          # outlines larger than this mean the photo is already cropped
+
+
+# Raised when an upload cannot be read as an image; a ValueError, since the input is at fault
+class ImageDecodeError(ValueError):
+    pass
+
+
+# One uploaded image, decoded at most once. The RGB, BGR and gray views are produced lazily
+# and memoised, so no colour conversion runs twice within a verification. With target_side,
+# JPEGs are decoded in PIL draft mode at the smallest DCT scale whose long side still covers it.
+class ImageHandle:
+    def __init__(self, data=None, target_side=None):
+        if data is not None and not isinstance(data, (bytes, bytearray, memoryview)):
+            data = _read_bytes(data)
+        self.data = data
+        self.target_side = target_side
+        self.full_size = None       # (width, height) of the upload after EXIF orientation
+        self.decoded_size = None    # (width, height) of the RGB view
+        self._views = {}
+        self._digest = None
+        self._lock = threading.RLock()     # views are derived from other views
+
+    @classmethod
+    def from_array(cls, rgb):
+        handle = cls()
+        handle._views['rgb'] = rgb
+        handle.full_size = handle.decoded_size = (rgb.shape[1], rgb.shape[0])
+        return handle
+
+    def _decode(self, target_side):
+        from PIL import Image, ImageOps
+
+        try:
+            with span('decode'), Image.open(io.BytesIO(self.data)) as img:
+                width, height = img.size
+                if img.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF orientations that swap the axes
+                    width, height = height, width
+                if target_side:
+                    img.draft('RGB', _draft_size(img.size, target_side))
+                rgb = np.array(ImageOps.exif_transpose(img).convert('RGB'))
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise ImageDecodeError(f"Could not decode image: {e}") from e
+        return rgb, (width, height)
+
+    def probe(self):
+        # (full size, decoded size) from the header alone, so memory can be planned before decoding
+        if self.decoded_size is not None:
+            return self.full_size, self.decoded_size
+        from PIL import Image
+
+        try:
+            with Image.open(io.BytesIO(self.data)) as img:
+                swap = img.getexif().get(0x0112) in (5, 6, 7, 8)
+                full = img.size
+                if self.target_side:
+                    img.draft('RGB', _draft_size(full, self.target_side))
+                decoded = img.size
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise ImageDecodeError(f"Could not decode image: {e}") from e
+        if swap:
+            full, decoded = full[::-1], decoded[::-1]
+        return full, decoded
+
+    def _view(self, name, make):
+        with self._lock:
+            view = self._views.get(name)
+            if view is None:
+                view = self._views[name] = make()
+            return view
+
+    def _make_rgb(self):
+        rgb, self.full_size = self._decode(self.target_side)
+        self.decoded_size = (rgb.shape[1], rgb.shape[0])
+        return rgb
+
+    def release(self):
+        # Drop the memoised views; the encoded bytes stay, so a later access decodes again.
+        # Handles made from an array keep their RGB view, which is all they have.
+        with self._lock:
+            keep = {} if self.data is not None else {'rgb': self._views['rgb']}
+            self._views = keep
+
+    @property
+    def rgb(self):
+        return self._view('rgb', self._make_rgb)
+
+    @property
+    def bgr(self):
+        return self._view('bgr', lambda: cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR))
+
+    @property
+    def gray(self):
+        return self._view('gray', lambda: cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY))
+
+    @property
+    def decode_scale(self):
+        # Decoded width relative to the upload's full width (< 1 after a draft decode)
+        if self.decoded_size is None:
+            self.rgb
+        return self.decoded_size[0] / self.full_size[0]
+
+    def full_resolution(self):
+        # RGB at the upload's full size; not memoised, it is only needed for occasional crops
+        if self.data is None or self.decode_scale == 1.0:
+            return self.rgb
+        return self._decode(None)[0]
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = content_digest(self.data if self.data is not None else self.rgb)
+        return self._digest
+
+
+def _draft_size(size, target_side):
+    # Draft request that only needs the long side to cover target_side: PIL keeps a DCT scale
+    # only while both sides stay at or above the request, so a square request would make a
+    # 4000x3000 photo decode at full size for a 1600 px target
+    width, height = size
+    scale = target_side / max(width, height)
+    return math.ceil(width * scale), math.ceil(height * scale)
+
+
+def _read_bytes(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    return source.read()
+
+
+# Helper: Wrap bytes, a path, a file-like object or an RGB array in an ImageHandle
+def as_image_handle(source, target_side=None):
+    if isinstance(source, ImageHandle):
+        return source
+    if isinstance(source, np.ndarray):
+        return ImageHandle.from_array(source)
+    return ImageHandle(source, target_side=target_side)
+
+
+# Helper: Downscale so the longest side is at most max_side; returns (image, scale)
+def clamp_resolution(img, max_side=MAX_IMAGE_SIDE):
+    scale = min(1.0, max_side / max(img.shape[:2]))
+    if scale >= 1.0:
+        return img, 1.0
+    return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA), scale
+
+
+# Helper: Handle whose longest side is at most max_side (the same handle when it already fits)
+def clamp_handle(handle, max_side=MAX_IMAGE_SIDE):
+    clamped, scale = clamp_resolution(handle.rgb, max_side)
+    return handle if scale == 1.0 else ImageHandle.from_array(clamped)
+
+
+def _order_corners(points):
+    # top-left, top-right, bottom-right, bottom-left
+    points = points.reshape(4, 2).astype(np.float32)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+# Helper: Corners of the ID card in an RGB image, or None when no clear outline is found
+def find_card_quad(img):
+    height, width = img.shape[:2]
+    scale = min(1.0, CARD_SEARCH_SIDE / max(height, width))
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else img
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, None)
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    image_area = small.shape[0] * small.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) != 4 or not cv2.isContourConvex(approx):
+            continue
+        area = cv2.contourArea(approx)
+        if area < CARD_MIN_AREA * image_area or area > CARD_FULL_FRAME * image_area:
+            continue
+        return _order_corners(approx / scale)
+    return None
+
+
+# An image prepared for OCR and face detection, with the transform back to the uploaded
+# photo so boxes found on it can be located (and re-cropped at full resolution) there.
+@dataclass
+class NormalizedImage:
+    view: ImageHandle           # the normalised image and its memoised views
+    source: ImageHandle         # the upload it came from
+    to_original: np.ndarray     # 3x3 homography: normalised pixel -> full-resolution upload pixel
+    card_found: bool = False
+
+    @property
+    def image(self):
+        return self.view.rgb
+
+    def to_original_box(self, box):
+        x0, y0, x1, y1 = box
+        corners = np.array([[[x0, y0], [x1, y0], [x1, y1], [x0, y1]]], dtype=np.float32)
+        mapped = cv2.perspectiveTransform(corners, self.to_original)[0]
+        width, height = self.source.full_size
+        return (
+            max(0, int(np.floor(mapped[:, 0].min()))),
+            max(0, int(np.floor(mapped[:, 1].min()))),
+            min(width, int(np.ceil(mapped[:, 0].max()))),
+            min(height, int(np.ceil(mapped[:, 1].max()))),
+        )
+
+    def crop_original(self, box):
+        x0, y0, x1, y1 = self.to_original_box(box)
+        return self.source.full_resolution()[y0:y1, x0:x1]
+
+
+# Helper: Clamp resolution and, for ID photos, crop the card and correct its perspective
+def normalize_document(source, max_side=MAX_IMAGE_SIDE, crop_card=CARD_CROP):
+    handle = as_image_handle(source, target_side=max_side)
+    clamped, scale = clamp_resolution(handle.rgb, max_side)
+    scale *= handle.decode_scale
+    to_original = np.diag([1 / scale, 1 / scale, 1.0])
+
+    quad = find_card_quad(clamped) if crop_card else None
+    if quad is None:
+        view = handle if clamped is handle.rgb else ImageHandle.from_array(clamped)
+        return NormalizedImage(view, handle, to_original)
+
+    top_left, top_right, bottom_right, bottom_left = quad
+    width = int(max(np.linalg.norm(top_right - top_left), np.linalg.norm(bottom_right - bottom_left)))
+    height = int(max(np.linalg.norm(bottom_left - top_left), np.linalg.norm(bottom_right - top_right)))
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    warp = cv2.getPerspectiveTransform(quad, target)
+    card = cv2.warpPerspective(clamped, warp, (width, height), flags=cv2.INTER_LINEAR)
+    return NormalizedImage(ImageHandle.from_array(card), handle, to_original @ np.linalg.inv(warp), card_found=True)
@@ -0,0 +1,157 @@
+# Frame analysis for the live camera: which frames to analyse, the reusable work arrays and
+# the per-frame quality metrics. Kept apart from live_camera.py, which needs av and
+# streamlit-webrtc, so it can be used and tested without the webcam stack.
+import math
+
+import cv2
+import numpy as np
+
+from detectors import get_face_cascade
+
+# Live analysis tuning
+DETECT_WIDTH = 320                # width of the downscaled frame the face cascade scans
+FRAME_BUDGET_SECONDS = 1 / 30     # time available per frame at the requested 30 fps
+MAX_ANALYSIS_INTERVAL = 15        # never reuse metrics for more than this many frames
+CHANGE_THRESHOLD = 10.0           # mean abs thumbnail difference (0-255) that counts as a new scene
+THUMBNAIL_SIZE = (64, 48)
+
+
+# Decides which frames get the full quality analysis. Between analyses the overlay reuses
+# the last metrics. The interval grows when analysis cost would overrun the frame budget
+# and shrinks again when the host has headroom.
+class AnalysisScheduler:
+    def __init__(self, frame_budget=FRAME_BUDGET_SECONDS, max_interval=MAX_ANALYSIS_INTERVAL,
+                 change_threshold=CHANGE_THRESHOLD):
+        self.frame_budget = frame_budget
+        self.max_interval = max_interval
+        self.change_threshold = change_threshold
+        self.interval = 1
+        self.analysis_seconds = None   # moving average of analysed frames
+        self.overhead_seconds = None   # moving average of frames that reused metrics
+        self.analysed = 0
+        self.skipped = 0
+        self._since_last = 0
+        self._has_reference = False
+        # Thumbnail of the current frame and of the last analysed one, swapped instead of reallocated
+        self._thumb = np.empty((THUMBNAIL_SIZE[1], THUMBNAIL_SIZE[0], 3), dtype=np.uint8)
+        self._last_thumb = np.empty_like(self._thumb)
+
+    def should_analyze(self, img):
+        self._since_last += 1
+        cv2.resize(img, THUMBNAIL_SIZE, dst=self._thumb, interpolation=cv2.INTER_AREA)
+        due = not self._has_reference or self._since_last >= self.interval
+        if not due and self._since_last >= math.ceil(self.interval / 2):
+            # A big scene change may pull the next analysis forward by up to half an interval
+            change = cv2.norm(self._thumb, self._last_thumb, cv2.NORM_L1) / self._thumb.size
+            due = change > self.change_threshold
+        if due:
+            self._thumb, self._last_thumb = self._last_thumb, self._thumb
+            self._has_reference = True
+            self._since_last = 0
+        return due
+
+    def record(self, seconds, analysed):
+        if analysed:
+            self.analysed += 1
+            self.analysis_seconds = _ema(self.analysis_seconds, seconds)
+        else:
+            self.skipped += 1
+            self.overhead_seconds = _ema(self.overhead_seconds, seconds)
+
+        # Spread one analysis over enough frames that the average frame fits the budget
+        spare = self.frame_budget - (self.overhead_seconds or 0.0)
+        spare = max(spare, self.frame_budget * 0.1)
+        needed = math.ceil((self.analysis_seconds or 0.0) / spare)
+        self.interval = min(self.max_interval, max(1, needed))
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'analysis_ms': (self.analysis_seconds or 0.0) * 1000,
+            'overhead_ms': (self.overhead_seconds or 0.0) * 1000,
+            'analysed_frames': self.analysed,
+            'reused_frames': self.skipped,
+        }
+
+
+def _ema(previous, value, alpha=0.2):
+    return value if previous is None else previous + alpha * (value - previous)
+
+
+# Work arrays for the live hot loop, allocated once per camera resolution and reused
+# through OpenCV dst= outputs so analysing a frame does not allocate full-size arrays.
+class FrameBuffers:
+    def __init__(self, detect_width=DETECT_WIDTH):
+        self.detect_width = detect_width
+        self.shape = None
+
+    def ensure(self, shape):
+        if shape == self.shape:
+            return self
+        height, width = shape[:2]
+        self.shape = shape
+        self.scale = min(1.0, self.detect_width / width)
+        self.small_size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        # Laplacian of uint8 input fits in int16 exactly, a quarter of the CV_64F footprint
+        self.laplacian = np.empty((height, width), dtype=np.int16)
+        self.small = np.empty((self.small_size[1], self.small_size[0]), dtype=np.uint8)
+        return self
+
+
+# Helper: Blur, lighting and face position metrics for one BGR frame
+def analyze_frame(img, detect_width=DETECT_WIDTH, tracker=None, buffers=None):
+    buffers = (buffers or FrameBuffers(detect_width)).ensure(img.shape)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=buffers.gray)
+
+    # Quality metrics: variance of the Laplacian, then mean/std of the gray frame in one pass
+    cv2.Laplacian(gray, cv2.CV_16S, dst=buffers.laplacian)
+    _, lap_std = cv2.meanStdDev(buffers.laplacian)
+    mean, std = cv2.meanStdDev(gray)
+    blur_score = float(lap_std[0, 0]) ** 2
+    brightness = float(mean[0, 0])
+    contrast = float(std[0, 0])
+
+    # Face detection on a downscaled copy; boxes are mapped back to frame coordinates
+    scale = buffers.scale
+    if scale < 1:
+        small = cv2.resize(gray, buffers.small_size, dst=buffers.small, interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+    if tracker is not None:
+        # Search around the previous face and only scan the whole frame when tracking is lost
+        box = tracker.update(small)
+    else:
+        # recv runs on the webrtc worker thread, so take that thread's cascade
+        faces = get_face_cascade().detectMultiScale(small, 1.2, 5)
+        box = max(faces, key=lambda face: face[2] * face[3]) if len(faces) > 0 else None
+
+    metrics = {
+        'blur_score': blur_score,
+        'brightness_score': brightness,
+        'contrast_score': contrast,
+        'face_box': None,
+        'face_centered': False,
+        'face_size_ok': False,
+    }
+
+    if box is not None:
+        (x, y, w, h) = (int(round(v / scale)) for v in box)
+        img_center_x = img.shape[1] // 2
+        img_center_y = img.shape[0] // 2
+        face_center_x = x + w // 2
+        face_center_y = y + h // 2
+
+        center_tolerance_x = img.shape[1] * 0.25
+        center_tolerance_y = img.shape[0] * 0.25
+
+        metrics['face_box'] = (x, y, w, h)
+        metrics['face_centered'] = (
+            abs(face_center_x - img_center_x) < center_tolerance_x and
+            abs(face_center_y - img_center_y) < center_tolerance_y
+        )
+
+        min_face_size = img.shape[1] * 0.15
+        metrics['face_size_ok'] = w > min_face_size
+
+    return metrics
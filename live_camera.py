@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import av
+import cv2
+import numpy as np
+from streamlit_webrtc import VideoTransformerBase
+
+from engine import capture_ready, overall_quality
+from face_tracking import FaceTracker
+from frame_buffer import FrameRingBuffer, frame_score
+from live_analysis import AnalysisScheduler, FrameBuffers, analyze_frame
+from metrics import observe
+from profiler import DEFAULT_INTERVAL_MS, ThreadSampler
+
+# Auto-capture tuning
+CAPTURE_BUFFER_FRAMES = 16        # analysed frames kept for best-frame selection
+AUTO_CAPTURE_STREAK = 5           # consecutive ready analyses before auto-capture fires
+AUTO_CAPTURE_WINDOW = 2.0         # seconds of buffered frames the best one is chosen from
+
+# Start the recv sampling profiler with the first frame (REALEYES_PROFILE_RECV=1)
+PROFILE_RECV = os.environ.get("REALEYES_PROFILE_RECV", "0") == "1"
+
+
+# Quality metrics of one analysed live frame, published by the webcam worker for the UI
+@dataclass(frozen=True)
+class QualitySnapshot:
+    timestamp: float
+    frame_index: int
+    blur_score: float
+    brightness_score: float
+    contrast_score: float
+    face_box: tuple
+    face_centered: bool
+    face_size_ok: bool
+    overall_quality: str
+    ready: bool
+
+    @classmethod
+    def from_metrics(cls, metrics, frame_index):
+        return cls(
+            timestamp=time.time(),
+            frame_index=frame_index,
+            overall_quality=overall_quality(
+                metrics['blur_score'], metrics['brightness_score'], metrics['contrast_score'],
+                metrics['face_centered'], metrics['face_size_ok'],
+            ),
+            ready=bool(capture_ready(metrics)),
+            **metrics,
+        )
+
+    # Same keys as engine.check_image_quality, for display_quality_feedback and the summary
+    def as_quality_checks(self):
+        return {
+            'blur_score': self.blur_score,
+            'brightness_score': self.brightness_score,
+            'contrast_score': self.contrast_score,
+            'face_centered': self.face_centered,
+            'face_size_ok': self.face_size_ok,
+            'overall_quality': self.overall_quality,
+        }
+
+
+# Helper: Draw the face box, center guide and quality indicators onto a BGR frame
+def draw_overlay(img, metrics):
+    blur_score = metrics['blur_score']
+    brightness = metrics['brightness_score']
+    contrast = metrics['contrast_score']
+    face_centered = metrics['face_centered']
+    face_size_ok = metrics['face_size_ok']
+
+    if metrics['face_box'] is not None:
+        (x, y, w, h) = metrics['face_box']
+
+        # Draw face rectangle with quality-based color
+        if face_centered and face_size_ok and blur_score > 100:
+            color = (0, 255, 0)  # Green for perfect
+            status = "Perfect! Ready to capture"
+        elif face_centered and face_size_ok:
+            color = (255, 165, 0)  # Orange for good position but quality issues
+            status = "Good position, hold steady"
+        elif face_centered or face_size_ok:
+            color = (255, 165, 0)  # Orange for partial success
+            status = "Adjust position"
+        else:
+            color = (0, 0, 255)  # Red for poor
+            status = "Center your face"
+
+        cv2.rectangle(img, (x, y), (x + w, y + h), color, 3)
+        cv2.putText(img, status, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+    else:
+        cv2.putText(img, "No face detected", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+
+    # Draw center guide
+    center_x, center_y = img.shape[1] // 2, img.shape[0] // 2
+    cv2.circle(img, (center_x, center_y), 5, (255, 255, 255), -1)
+    cv2.circle(img, (center_x, center_y), 120, (255, 255, 255), 2)
+    cv2.circle(img, (center_x, center_y), 80, (255, 255, 255), 1)
+
+    # Quality indicators
+    y_offset = 30
+
+    # Sharpness indicator
+    blur_color = (0, 255, 0) if blur_score > 100 else (255, 165, 0) if blur_score > 50 else (0, 0, 255)
+    blur_text = f"Sharpness: {'Excellent' if blur_score > 100 else 'Fair' if blur_score > 50 else 'Poor'}"
+    cv2.putText(img, blur_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, blur_color, 2)
+    y_offset += 30
+
+    # Lighting indicator
+    bright_color = (0, 255, 0) if 50 < brightness < 200 else (0, 0, 255)
+    bright_text = f"Lighting: {'Good' if 50 < brightness < 200 else 'Adjust'}"
+    cv2.putText(img, bright_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, bright_color, 2)
+    y_offset += 30
+
+    # Contrast indicator
+    contrast_color = (0, 255, 0) if contrast > 20 else (255, 165, 0) if contrast > 10 else (0, 0, 255)
+    contrast_text = f"Contrast: {'Good' if contrast > 20 else 'Fair' if contrast > 10 else 'Poor'}"
+    cv2.putText(img, contrast_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, contrast_color, 2)
+    y_offset += 30
+
+    # Position indicator
+    if metrics['face_box'] is not None:
+        pos_color = (0, 255, 0) if face_centered and face_size_ok else (255, 165, 0)
+        pos_text = f"Position: {'Perfect' if face_centered and face_size_ok else 'Adjust'}"
+        cv2.putText(img, pos_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, pos_color, 2)
+
+
+# VideoProcessor for webcam. recv runs on the webrtc worker thread; the UI thread reads the
+# latest quality snapshot and the clean (un-annotated) frame through read_snapshot().
+# With auto_capture on, the sharpest ready frame of the last few seconds is kept for the UI
+# once readiness has held for AUTO_CAPTURE_STREAK analyses in a row.
+class VideoProcessor(VideoTransformerBase):
+    def __init__(self):
+        self.frame_count = 0
+        self.scheduler = AnalysisScheduler()
+        self.tracker = FaceTracker()
+        self.metrics = None
+        self.auto_capture = False
+        self.ready_streak = 0
+        self.frame_buffer = FrameRingBuffer(CAPTURE_BUFFER_FRAMES)
+        self.buffers = FrameBuffers()
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._auto_frame = None
+        # Two preallocated BGR slots for the clean frame: recv fills one while the other is published
+        self._clean = None
+        self._published = None
+        # Thread recv runs on, for the sampling profiler
+        self.thread_id = None
+        self.profiler = None
+        self._profile_frames = (0, 0)    # frame_count when profiling started and stopped
+
+    def start_profiling(self, interval_ms=DEFAULT_INTERVAL_MS):
+        # Sample the recv thread until stop_profiling(); None until the first frame has arrived
+        if self.thread_id is None:
+            return None
+        if self.profiler is None or not self.profiler.running:
+            self._profile_frames = (self.frame_count, None)
+            self.profiler = ThreadSampler(self.thread_id, interval_ms, focus='recv').start()
+        return self.profiler
+
+    def stop_profiling(self):
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+            self._profile_frames = (self._profile_frames[0], self.frame_count)
+        return self.profiler
+
+    @property
+    def profiled_frames(self):
+        first, last = self._profile_frames
+        return (self.frame_count if last is None else last) - first
+
+    def _publish_clean(self, img):
+        if self._clean is None or self._clean.shape[1:] != img.shape:
+            with self._lock:
+                self._clean = np.empty((2,) + img.shape, dtype=np.uint8)
+                self._published = None
+        slot = 0 if self._published != 0 else 1
+        np.copyto(self._clean[slot], img)
+        return slot
+
+    def _clean_rgb(self):
+        # Called with the lock held; the RGB copy is only made when someone asks for it
+        if self._published is None:
+            return None
+        return cv2.cvtColor(self._clean[self._published], cv2.COLOR_BGR2RGB)
+
+    def read_snapshot(self, with_frame=True):
+        with self._lock:
+            return self._snapshot, self._clean_rgb() if with_frame else None
+
+    def take_auto_capture(self):
+        # RGB frame chosen by auto-capture, handed out once
+        with self._lock:
+            frame, self._auto_frame = self._auto_frame, None
+            return frame
+
+    @property
+    def latest_frame(self):
+        with self._lock:
+            return self._clean_rgb()
+
+    def _update_auto_capture(self, img, ready):
+        self.frame_buffer.push(img, frame_score(self.metrics, ready))
+        self.ready_streak = self.ready_streak + 1 if ready else 0
+        if not self.auto_capture or self.ready_streak < AUTO_CAPTURE_STREAK:
+            return
+        with self._lock:
+            if self._auto_frame is not None:
+                return
+        best, _ = self.frame_buffer.best(AUTO_CAPTURE_WINDOW)
+        if best is not None:
+            cv2.cvtColor(best, cv2.COLOR_BGR2RGB, dst=best)
+            with self._lock:
+                self._auto_frame = best
+            self.ready_streak = 0
+
+    def recv(self, frame):
+        start = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        if PROFILE_RECV and self.profiler is None:
+            self.start_profiling()
+        img = frame.to_ndarray(format="bgr24")
+
+        snapshot = None
+        analysed = self.scheduler.should_analyze(img)
+        if analysed:
+            self.metrics = analyze_frame(img, tracker=self.tracker, buffers=self.buffers)
+            snapshot = QualitySnapshot.from_metrics(self.metrics, self.frame_count)
+            self._update_auto_capture(img, snapshot.ready)
+
+        # Keep a clean copy for capture before the overlay is drawn onto img
+        slot = self._publish_clean(img)
+        with self._lock:
+            self._published = slot
+            if snapshot is not None:
+                self._snapshot = snapshot
+
+        draw_overlay(img, self.metrics)
+        self.frame_count += 1
+        elapsed = time.perf_counter() - start
+        self.scheduler.record(elapsed, analysed)
+        observe('recv_analysed' if analysed else 'recv', elapsed)
+
+        return av.VideoFrame.from_ndarray(img, format="bgr24")
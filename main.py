@@ -1,17 +1,12 @@
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
-import re
-from datetime import datetime
-import ssl
-from streamlit_webrtc import webrtc_streamer, VideoTransformerBase, RTCConfiguration
-import av
-import easyocr
 import time
 
-# Fix SSL certificate issue for EasyOCR downloads (for some environments)
-ssl._create_default_https_context = ssl._create_unverified_context
+from embedding_index import DEFAULT_INDEX_DIR
+from engine import ADULT_AGE, OCR_LANGUAGES, default_face_index, verify
+from images import MAX_IMAGE_SIDE, ImageHandle
+import metrics
+from result_cache import get_result_cache
+from warmup import WARMUP_ENABLED, start_warmup
 
 # Page configuration
 st.set_page_config(
@@ -21,132 +16,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Helper: Extract DOB from OCR text
-def extract_dob(text_lines):
-    dob_patterns = [
-        r'(\d{2}[/-]\d{2}[/-]\d{4})',
-        r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})',
-        r'DOB[:\s]*(\d{2}[/-]\d{2}[/-]\d{4})',
-        r'Birth[:\s]*(\d{2}[/-]\d{2}[/-]\d{4})'
-    ]
-    
-    for line in text_lines:
-        for pattern in dob_patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                return match.group(1) if len(dob_patterns) > 2 and 'DOB' in pattern else match.group(1)
-    return None
-
-# Helper: Calculate age from DOB string
-def calculate_age(dob_str):
-    try:
-        # Try different date formats
-        formats = ["%d/%m/%Y", "%d-%m-%Y", "%m/%d/%Y", "%m-%d-%Y"]
-        dob = None
-        
-        for fmt in formats:
-            try:
-                dob = datetime.strptime(dob_str.replace("-", "/"), fmt.replace("-", "/"))
-                break
-            except ValueError:
-                continue
-        
-        if dob is None:
-            return None
-            
-        today = datetime.today()
-        age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-        return age
-    except Exception:
-        return None
-
-# Helper: Extract face from image using OpenCV
-def extract_face(img):
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4, minSize=(50, 50))
-    
-    if len(faces) > 0:
-        # Get the largest face
-        (x, y, w, h) = max(faces, key=lambda face: face[2] * face[3])
-        margin = int(0.2 * w)
-        x1 = max(0, x - margin)
-        y1 = max(0, y - margin)
-        x2 = min(img.shape[1], x + w + margin)
-        y2 = min(img.shape[0], y + h + margin)
-        return img[y1:y2, x1:x2]
-    return None
-
-# Helper: Check image quality for selfies
-def check_image_quality(img):
-    quality_checks = {
-        'blur_score': 0,
-        'brightness_score': 0,
-        'contrast_score': 0,
-        'face_centered': False,
-        'face_size_ok': False,
-        'overall_quality': 'Poor'
-    }
-    
-    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    
-    # Blur detection using Laplacian variance
-    blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
-    quality_checks['blur_score'] = blur_score
-    
-    # Brightness analysis
-    brightness = np.mean(gray)
-    quality_checks['brightness_score'] = brightness
-    
-    # Contrast analysis
-    contrast = gray.std()
-    quality_checks['contrast_score'] = contrast
-    
-    # Face detection and positioning
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-    faces = face_cascade.detectMultiScale(gray, 1.2, 5)
-    
-    if len(faces) > 0:
-        (x, y, w, h) = max(faces, key=lambda face: face[2] * face[3])
-        img_center_x = img.shape[1] // 2
-        img_center_y = img.shape[0] // 2
-        face_center_x = x + w // 2
-        face_center_y = y + h // 2
-        
-        center_tolerance_x = img.shape[1] * 0.25
-        center_tolerance_y = img.shape[0] * 0.25
-        
-        quality_checks['face_centered'] = (
-            abs(face_center_x - img_center_x) < center_tolerance_x and
-            abs(face_center_y - img_center_y) < center_tolerance_y
-        )
-        
-        min_face_size = img.shape[1] * 0.15
-        quality_checks['face_size_ok'] = w > min_face_size
-    
-    # Overall quality assessment
-    blur_ok = blur_score > 100
-    brightness_ok = 50 < brightness < 200
-    contrast_ok = contrast > 20
-    
-    score = 0
-    if blur_ok: score += 25
-    if brightness_ok: score += 25
-    if contrast_ok: score += 15
-    if quality_checks['face_centered']: score += 20
-    if quality_checks['face_size_ok']: score += 15
-    
-    if score >= 85:
-        quality_checks['overall_quality'] = 'Excellent'
-    elif score >= 65:
-        quality_checks['overall_quality'] = 'Good'
-    elif score >= 45:
-        quality_checks['overall_quality'] = 'Fair'
-    else:
-        quality_checks['overall_quality'] = 'Poor'
-    
-    return quality_checks
-
 def display_quality_feedback(quality_checks):
     st.markdown('<h4 class="quality-header">Image Quality Analysis</h4>', unsafe_allow_html=True)
     
@@ -222,103 +91,34 @@ def display_quality_feedback(quality_checks):
     if tips:
         st.info("**Improvement Tips:**\n" + "\n".join(f"• {tip}" for tip in tips))
 
-# VideoProcessor for webcam
-class VideoProcessor(VideoTransformerBase):
-    def __init__(self):
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-        self.latest_frame = None
-        self.frame_count = 0
-
-    def recv(self, frame):
-        img = frame.to_ndarray(format="bgr24")
-        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Quality metrics
-        blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
-        brightness = np.mean(gray)
-        contrast = gray.std()
+# Compact live quality display from a camera QualitySnapshot
+def render_live_quality(placeholder, snapshot, celebrate=True):
+    with placeholder.container():
+        metrics_col1, metrics_col2 = st.columns(2)
         
-        # Face detection
-        faces = self.face_cascade.detectMultiScale(gray, 1.2, 5)
-        face_centered = False
-        face_size_ok = False
-        
-        if len(faces) > 0:
-            (x, y, w, h) = max(faces, key=lambda face: face[2] * face[3])
-            img_center_x = img.shape[1] // 2
-            img_center_y = img.shape[0] // 2
-            face_center_x = x + w // 2
-            face_center_y = y + h // 2
-            
-            center_tolerance_x = img.shape[1] * 0.25
-            center_tolerance_y = img.shape[0] * 0.25
-            
-            face_centered = (
-                abs(face_center_x - img_center_x) < center_tolerance_x and
-                abs(face_center_y - img_center_y) < center_tolerance_y
-            )
-            
-            min_face_size = img.shape[1] * 0.15
-            face_size_ok = w > min_face_size
-            
-            # Draw face rectangle with quality-based color
-            if face_centered and face_size_ok and blur_score > 100:
-                color = (0, 255, 0)  # Green for perfect
-                status = "Perfect! Ready to capture"
-            elif face_centered and face_size_ok:
-                color = (255, 165, 0)  # Orange for good position but quality issues
-                status = "Good position, hold steady"
-            elif face_centered or face_size_ok:
-                color = (255, 165, 0)  # Orange for partial success
-                status = "Adjust position"
+        with metrics_col1:
+            blur_score = snapshot.blur_score
+            if blur_score > 100:
+                st.success("Sharp")
+            elif blur_score > 50:
+                st.warning("Fair")
             else:
-                color = (0, 0, 255)  # Red for poor
-                status = "Center your face"
-            
-            cv2.rectangle(img, (x, y), (x + w, y + h), color, 3)
-            cv2.putText(img, status, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-        else:
-            cv2.putText(img, "No face detected", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                st.error("Blurry")
         
-        # Draw center guide
-        center_x, center_y = img.shape[1] // 2, img.shape[0] // 2
-        cv2.circle(img, (center_x, center_y), 5, (255, 255, 255), -1)
-        cv2.circle(img, (center_x, center_y), 120, (255, 255, 255), 2)
-        cv2.circle(img, (center_x, center_y), 80, (255, 255, 255), 1)
-        
-        # Quality indicators
-        y_offset = 30
-        
-        # Sharpness indicator
-        blur_color = (0, 255, 0) if blur_score > 100 else (255, 165, 0) if blur_score > 50 else (0, 0, 255)
-        blur_text = f"Sharpness: {'Excellent' if blur_score > 100 else 'Fair' if blur_score > 50 else 'Poor'}"
-        cv2.putText(img, blur_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, blur_color, 2)
-        y_offset += 30
-        
-        # Lighting indicator
-        bright_color = (0, 255, 0) if 50 < brightness < 200 else (0, 0, 255)
-        bright_text = f"Lighting: {'Good' if 50 < brightness < 200 else 'Adjust'}"
-        cv2.putText(img, bright_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, bright_color, 2)
-        y_offset += 30
-        
-        # Contrast indicator
-        contrast_color = (0, 255, 0) if contrast > 20 else (255, 165, 0) if contrast > 10 else (0, 0, 255)
-        contrast_text = f"Contrast: {'Good' if contrast > 20 else 'Fair' if contrast > 10 else 'Poor'}"
-        cv2.putText(img, contrast_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, contrast_color, 2)
-        y_offset += 30
-        
-        # Position indicator
-        if len(faces) > 0:
-            pos_color = (0, 255, 0) if face_centered and face_size_ok else (255, 165, 0)
-            pos_text = f"Position: {'Perfect' if face_centered and face_size_ok else 'Adjust'}"
-            cv2.putText(img, pos_text, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.6, pos_color, 2)
-        
-        # Save the latest RGB frame for capture
-        self.latest_frame = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.frame_count += 1
+        with metrics_col2:
+            brightness = snapshot.brightness_score
+            if 50 < brightness < 200:
+                st.success("Good Light")
+            else:
+                st.error("Adjust Light")
         
-        return av.VideoFrame.from_ndarray(img, format="bgr24")
+        # Overall readiness status
+        if snapshot.ready:
+            st.success("**Ready to Capture!**")
+            if celebrate:
+                st.balloons()
+        else:
+            st.info("Adjust position for better quality")
 
 # Enhanced CSS with modern professional design
 st.markdown("""
@@ -741,6 +541,9 @@ if 'aadhar_processed' not in st.session_state:
 if 'selfie_captured' not in st.session_state:
     st.session_state.selfie_captured = False
 
+# Models load in the background (once per process) while the page renders
+warmup = start_warmup(OCR_LANGUAGES) if WARMUP_ENABLED else None
+
 # Main container
 st.markdown('<div class="main-container">', unsafe_allow_html=True)
 
@@ -778,6 +581,16 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Readiness of the background model warm-up
+if warmup is not None:
+    warmup_status = warmup.status()
+    failed = {name: step['error'] for name, step in warmup_status['steps'].items() if step['status'] == 'failed'}
+    if failed:
+        st.warning("Some models could not be loaded: " + "; ".join(f"{name}: {error}" for name, error in failed.items()))
+    elif not warmup_status['done']:
+        loaded = sum(step['status'] == 'ready' for step in warmup_status['steps'].values())
+        st.info(f"Preparing verification models in the background ({loaded}/{len(warmup_status['steps'])} ready). You can start uploading now.")
+
 # Document Upload Section
 st.markdown('<div class="verification-card">', unsafe_allow_html=True)
 st.markdown('''
@@ -826,6 +639,7 @@ selfie_option = st.radio(
 
 selfie_img = None
 selfie_file = None
+auto_capture_watch = None
 
 if selfie_option == "Live Camera with Real-time Feedback":
     st.markdown("### Live Camera Setup")
@@ -863,6 +677,10 @@ if selfie_option == "Live Camera with Real-time Feedback":
         </div>
         """, unsafe_allow_html=True)
     
+    # The webcam stack (streamlit-webrtc, av) is only imported when the camera is used
+    from streamlit_webrtc import RTCConfiguration, webrtc_streamer
+    from live_camera import VideoProcessor
+    
     cam_col1, cam_col2 = st.columns([3, 2])
     
     with cam_col1:
@@ -884,6 +702,13 @@ if selfie_option == "Live Camera with Real-time Feedback":
         st.markdown('<h4 class="quality-header"><i class="fas fa-chart-line"></i> Live Quality Monitor</h4>', unsafe_allow_html=True)
         quality_placeholder = st.empty()
         
+        auto_capture = st.toggle(
+            "Auto-capture when ready",
+            value=True,
+            key="auto_capture",
+            help="Keeps the sharpest frame once all indicators have stayed green for a moment"
+        )
+        
         # Enhanced capture button
         capture_button = st.button(
             "Capture Perfect Selfie", 
@@ -892,68 +717,68 @@ if selfie_option == "Live Camera with Real-time Feedback":
             help="Click when all quality indicators are green"
         )
         
+        video_processor = None
+        if (webrtc_ctx and webrtc_ctx.state.playing
+            and hasattr(webrtc_ctx, "video_processor")
+            and webrtc_ctx.video_processor is not None):
+            video_processor = webrtc_ctx.video_processor
+            video_processor.auto_capture = auto_capture
+        
+        # Quality snapshot and clean frame published by the camera worker (no recomputation here)
+        live_snapshot, live_frame = (
+            video_processor.read_snapshot(with_frame=capture_button) if video_processor else (None, None)
+        )
+        
         if capture_button:
-            if (webrtc_ctx and webrtc_ctx.state.playing
-                and hasattr(webrtc_ctx, "video_processor")
-                and webrtc_ctx.video_processor is not None
-                and webrtc_ctx.video_processor.latest_frame is not None):
-                
-                selfie_img = webrtc_ctx.video_processor.latest_frame
-                selfie_file = "captured"
+            if live_frame is not None:
+                st.session_state.captured_selfie = live_frame
                 st.session_state.selfie_captured = True
                 
                 st.success("Perfect! Selfie captured successfully!")
-                st.image(selfie_img, caption="Your Captured Selfie", use_container_width=True)
+                st.image(live_frame, caption="Your Captured Selfie", use_container_width=True)
                 
                 # Auto-scroll to next section
                 time.sleep(1)
                 st.rerun()
             else:
                 st.error("Camera not ready. Please ensure camera is active and try again.")
-                selfie_file = None
+        
+        if st.session_state.get('captured_selfie') is not None:
+            selfie_img = st.session_state.captured_selfie
+            selfie_file = "captured"
+            st.image(selfie_img, caption="Your Captured Selfie", use_container_width=True)
+            if st.button("Retake Selfie", use_container_width=True):
+                del st.session_state.captured_selfie
+                st.session_state.selfie_captured = False
+                st.rerun()
+        elif video_processor is not None and auto_capture:
+            # Polled at the end of the page so the rest of it renders first
+            auto_capture_watch = (webrtc_ctx, video_processor, quality_placeholder)
         
         # Live quality feedback with enhanced UI
-        if (webrtc_ctx and webrtc_ctx.state.playing
-            and hasattr(webrtc_ctx, "video_processor")
-            and webrtc_ctx.video_processor is not None
-            and webrtc_ctx.video_processor.latest_frame is not None):
-            
-            img = webrtc_ctx.video_processor.latest_frame
-            quality_checks = check_image_quality(img)
-            
-            with quality_placeholder.container():
-                # Compact live quality display
-                metrics_col1, metrics_col2 = st.columns(2)
-                
-                with metrics_col1:
-                    blur_score = quality_checks['blur_score']
-                    if blur_score > 100:
-                        st.success("Sharp")
-                    elif blur_score > 50:
-                        st.warning("Fair")
-                    else:
-                        st.error("Blurry")
-                
-                with metrics_col2:
-                    brightness = quality_checks['brightness_score']
-                    if 50 < brightness < 200:
-                        st.success("Good Light")
-                    else:
-                        st.error("Adjust Light")
-                
-                # Overall readiness status
-                overall_ready = (
-                    quality_checks['face_centered'] and 
-                    quality_checks['face_size_ok'] and 
-                    blur_score > 100 and
-                    50 < brightness < 200
-                )
-                
-                if overall_ready:
-                    st.success("**Ready to Capture!**")
-                    st.balloons()
+        if live_snapshot is not None:
+            render_live_quality(quality_placeholder, live_snapshot)
+        
+        # Opt-in sampling profiler for the camera thread, switched on and off in a running session
+        if video_processor is not None:
+            with st.expander("Profile Live Video"):
+                if st.checkbox("Sample the camera thread", key="profile_recv"):
+                    video_processor.start_profiling()
                 else:
-                    st.info("Adjust position for better quality")
+                    video_processor.stop_profiling()
+                profiler = video_processor.profiler
+                if profiler is not None:
+                    frames = video_processor.profiled_frames
+                    summary = profiler.summary(frames)
+                    st.caption(
+                        f"{summary['samples']} samples over {frames} frames in {summary['seconds']:.1f}s "
+                        f"(camera thread busy {summary['busy_percent']:.0f}% of the time)"
+                    )
+                    st.dataframe(profiler.operation_table(frames), use_container_width=True)
+                    st.download_button(
+                        "Download Collapsed Stacks", profiler.collapsed(), file_name="recv.collapsed",
+                        mime="text/plain", help="For flamegraph.pl or speedscope.app",
+                    )
 
 else:
     st.markdown("### File Upload")
@@ -969,7 +794,8 @@ else:
     
     with upload_col2:
         if selfie_file is not None:
-            selfie_img = np.array(Image.open(selfie_file).convert('RGB'))
+            # Decoded lazily (draft mode, at most once) when verification needs it
+            selfie_img = ImageHandle(selfie_file.getvalue(), target_side=MAX_IMAGE_SIDE)
             st.success("Selfie uploaded!")
             st.session_state.selfie_captured = True
 
@@ -986,17 +812,30 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
     </div>
     ''', unsafe_allow_html=True)
     
-    # Load and process images
-    aadhar_img = np.array(Image.open(aadhar_file).convert('RGB'))
+    # Run the verification engine (each stage is memoised on the content digest of its inputs)
+    live_capture = selfie_file == "captured"
+    if warmup is not None and not warmup.done:
+        # Loading the same models again alongside the warm-up would only slow both down
+        with st.spinner('Finishing model warm-up...'):
+            warmup.wait()
+    with st.spinner('Verifying your identity...'):
+        verification = verify(
+            ImageHandle(aadhar_file.getvalue(), target_side=MAX_IMAGE_SIDE),
+            selfie_img,
+            live_capture=live_capture,
+            cache=get_result_cache(),
+            index=default_face_index(),
+        )
+    
+    quality_checks = verification.quality
     
-    if selfie_file == "captured" and selfie_img is not None:
+    if live_capture and selfie_img is not None:
         st.success("Using captured selfie from live camera")
-    elif selfie_img is not None:
+    elif selfie_img is not None and quality_checks is not None:
         st.info("Using uploaded selfie image")
         
         # Quality check for uploaded images
         st.markdown('<div class="verification-card">', unsafe_allow_html=True)
-        quality_checks = check_image_quality(selfie_img)
         display_quality_feedback(quality_checks)
         
         if quality_checks['overall_quality'] == 'Poor':
@@ -1004,6 +843,14 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
             st.info("**Pro Tips:** Use bright lighting, steady hands, and center your face for optimal results.")
         st.markdown('</div>', unsafe_allow_html=True)
     
+    # Cheap checks (image size, face presence, selfie quality) reject before the document is read,
+    # as does a process already at its memory budget
+    if verification.failed_stage in ('memory', 'size', 'face', 'quality'):
+        reason = verification.errors.get(verification.failed_stage, "The images could not be verified")
+        st.error(f"**Submission rejected:** {reason}")
+        st.info("**Troubleshooting:** Upload full-size photos where your face is clearly visible, well-lit, and centered")
+        st.stop()
+    
     # Step 1: DOB Extraction with enhanced OCR
     st.markdown('<div class="verification-card">', unsafe_allow_html=True)
     st.markdown('''
@@ -1014,17 +861,12 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
     </div>
     ''', unsafe_allow_html=True)
     
-    with st.spinner('Analyzing document with advanced OCR technology...'):
-        try:
-            reader = easyocr.Reader(['en'], gpu=False)
-            result = reader.readtext(aadhar_img, detail=0, paragraph=True)
-            dob_str = extract_dob(result)
-        except Exception as e:
-            st.error(f"OCR processing failed: {str(e)}")
-            dob_str = None
+    if 'ocr' in verification.errors:
+        st.error(f"OCR processing failed: {verification.errors['ocr']}")
+    dob_str = verification.dob
     
     if dob_str:
-        age = calculate_age(dob_str)
+        age = verification.age
         
         # Enhanced metrics display
         col1, col2, col3 = st.columns(3)
@@ -1034,8 +876,8 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
             st.metric("Current Age", f"{age} years" if age is not None else "N/A")
         with col3:
             if age is not None:
-                status = "Adult" if age >= 18 else "Minor"
-                color = "normal" if age >= 18 else "inverse"
+                status = "Adult" if age >= ADULT_AGE else "Minor"
+                color = "normal" if age >= ADULT_AGE else "inverse"
             else:
                 status = "Unknown"
                 color = "normal"
@@ -1062,9 +904,8 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
     </div>
     ''', unsafe_allow_html=True)
     
-    with st.spinner('Detecting and extracting faces using AI...'):
-        aadhar_face = extract_face(cv2.cvtColor(aadhar_img, cv2.COLOR_RGB2BGR))
-        selfie_face = extract_face(cv2.cvtColor(selfie_img, cv2.COLOR_RGB2BGR))
+    aadhar_face = verification.id_face
+    selfie_face = verification.selfie_face
     
     if aadhar_face is not None and selfie_face is not None:
         st.success("Faces successfully detected in both images!")
@@ -1098,37 +939,13 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
     ''', unsafe_allow_html=True)
     
     try:
-        with st.spinner('Performing advanced biometric comparison...'):
-            # Enhanced face comparison with multiple methods
-            target_size = (128, 128)
-            aadhar_resized = cv2.resize(aadhar_face, target_size)
-            selfie_resized = cv2.resize(selfie_face, target_size)
-            
-            # Convert to grayscale for comparison
-            aadhar_gray = cv2.cvtColor(aadhar_resized, cv2.COLOR_BGR2GRAY)
-            selfie_gray = cv2.cvtColor(selfie_resized, cv2.COLOR_BGR2GRAY)
-            
-            # Template matching
-            result = cv2.matchTemplate(aadhar_gray, selfie_gray, cv2.TM_CCOEFF_NORMED)
-            similarity = result[0][0]
-            
-            # Histogram comparison for additional verification
-            hist1 = cv2.calcHist([aadhar_gray], [0], None, [256], [0, 256])
-            hist2 = cv2.calcHist([selfie_gray], [0], None, [256], [0, 256])
-            hist_similarity = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
-            
-            # Combined score
-            combined_score = (similarity * 0.7 + hist_similarity * 0.3)
-            sim_score = max(0, combined_score * 100)
-            
-            # Dynamic threshold based on image quality
-            base_threshold = 0.35
-            if selfie_file == "captured":  # Live camera usually has better quality
-                threshold = base_threshold - 0.05
-            else:
-                threshold = base_threshold
-            
-            match = combined_score > threshold
+        if 'compare' in verification.errors:
+            raise RuntimeError(verification.errors['compare'])
+        
+        similarity = verification.similarity_score
+        sim_score = verification.similarity_percent
+        threshold = verification.threshold
+        match = verification.match
         
         # Enhanced results display
         result_col1, result_col2, result_col3, result_col4 = st.columns(4)
@@ -1150,7 +967,7 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
             st.metric("Confidence", confidence)
         
         with result_col4:
-            method = "Live Camera" if selfie_file == "captured" else "File Upload"
+            method = "Live Camera" if live_capture else "File Upload"
             st.metric("Method", method)
         
         # Detailed feedback
@@ -1164,14 +981,27 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
         else:
             st.error(f"**Identity verification failed.** Similarity score: **{sim_score:.1f}%**")
             st.info("**Suggestions:** Ensure good lighting, remove accessories, and face the camera directly")
+        if verification.duplicates:
+            st.error(f"**Duplicate identity!** This face is already registered with {len(verification.duplicates)} other ID(s).")
         
         # Technical details (collapsible)
         with st.expander("Technical Details"):
-            st.write(f"**Template Matching Score:** {similarity:.3f}")
-            st.write(f"**Histogram Correlation:** {hist_similarity:.3f}")
-            st.write(f"**Combined Score:** {combined_score:.3f}")
+            st.write(f"**Embedding Backend:** {verification.face_backend}")
+            st.write(f"**Cosine Similarity:** {similarity:.3f}")
             st.write(f"**Threshold Used:** {threshold:.3f}")
-            st.info("**Note:** This demo uses OpenCV for face comparison. Production systems use advanced deep learning models for higher accuracy.")
+            if verification.dob_confidence is not None:
+                st.write(f"**DOB OCR Confidence:** {verification.dob_confidence:.2f}")
+            st.info("**Note:** Faces are compared as embedding vectors. Set `REALEYES_FACE_MODEL` to a face recognition ONNX model for deep-learning accuracy; without one, a pixel-correlation baseline is used.")
+            if st.checkbox("Show stage timings", key="show_stage_timings"):
+                st.write("**This verification (ms):**")
+                st.json(verification.timings_ms)
+                if metrics.METRICS_ENABLED:
+                    st.write("**All verifications in this process (ms):**")
+                    st.dataframe([
+                        {'stage': stage, 'count': data['count'], 'p50': data['p50_ms'], 'p95': data['p95_ms'],
+                         'p99': data['p99_ms'], 'mean': data['mean_ms']}
+                        for stage, data in metrics.snapshot().items()
+                    ])
         
     except Exception as e:
         st.error(f"Face verification failed: {str(e)}")
@@ -1191,7 +1021,7 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
     ''', unsafe_allow_html=True)
     
     if age is not None:
-        age_passed = age >= 18
+        age_passed = age >= ADULT_AGE
         
         # Create comprehensive summary
         st.markdown("### Complete Verification Report")
@@ -1208,7 +1038,7 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
             st.metric("Age Verification", age_status)
         
         with summary_col3:
-            overall_status = "APPROVED" if (match and age_passed) else "REJECTED"
+            overall_status = "APPROVED" if verification.approved else "REJECTED"
             st.metric("Overall Status", overall_status)
         
         # Detailed summary table
@@ -1226,23 +1056,23 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
                 "Detected" if (aadhar_face is not None and selfie_face is not None) else "Failed",
                 f"{'Verified' if match else 'Failed'} ({sim_score:.1f}%)",
                 f"{'Eligible' if age_passed else 'Ineligible'} ({age} years)",
-                f"{quality_checks['overall_quality']}" if 'quality_checks' in locals() else "Good",
-                "**APPROVED**" if (match and age_passed) else "**REJECTED**"
+                f"{quality_checks['overall_quality']}",
+                "**APPROVED**" if verification.approved else "**REJECTED**"
             ],
             "Details": [
                 f"DOB: {dob_str}" if dob_str else "Could not extract",
                 "Both faces detected successfully" if (aadhar_face is not None and selfie_face is not None) else "Face detection failed",
                 f"Similarity: {sim_score:.1f}%" if match else f"Below threshold ({sim_score:.1f}%)",
                 f"Age: {age} years" if age_passed else f"Under 18 ({age} years)",
-                quality_checks['overall_quality'] if 'quality_checks' in locals() else "Standard quality",
-                "All requirements met" if (match and age_passed) else "Requirements not met"
+                quality_checks['overall_quality'],
+                "All requirements met" if verification.approved else "Requirements not met"
             ]
         }
         
         st.table(summary_data)
         
         # Final status with enhanced styling
-        if match and age_passed:
+        if verification.approved:
             st.success("**VERIFICATION COMPLETE!** All security checks passed successfully.")
             st.balloons()
             
@@ -1282,14 +1112,37 @@ if aadhar_file and (selfie_img is not None or selfie_file is not None):
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-# Footer with additional information
+# Footer with additional information; with the duplicate-identity index enabled, part of every
+# approved submission is kept
+if DEFAULT_INDEX_DIR:
+    storage_note = ("Your images are processed locally and not stored. A face embedding, date of birth and image "
+                    "digest are kept from approved submissions to detect duplicate identities.")
+else:
+    storage_note = "Your images are processed locally and not stored on our servers."
 st.markdown("---")
-st.markdown("""
+st.markdown(f"""
 <div style="text-align: center; padding: 2rem; color: #6B7280;">
     <h4><i class="fas fa-shield-alt"></i> Privacy & Security</h4>
-    <p>Your images are processed locally and not stored on our servers. This demo is for educational purposes only.</p>
+    <p>{storage_note} This demo is for educational purposes only.</p>
     <p><strong>RealEyes</strong> - Advanced Identity Verification System | Built with ❤️ using Streamlit</p>
 </div>
 """, unsafe_allow_html=True)
 
-st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
+st.markdown('</div>', unsafe_allow_html=True)
+
+# Auto-capture: keep the live monitor fresh and pick up the frame the camera worker selected
+if auto_capture_watch is not None:
+    webrtc_ctx, video_processor, quality_placeholder = auto_capture_watch
+    last_frame_index = None
+    while webrtc_ctx.state.playing:
+        auto_frame = video_processor.take_auto_capture()
+        if auto_frame is not None:
+            st.session_state.captured_selfie = auto_frame
+            st.session_state.selfie_captured = True
+            st.rerun()
+        
+        live_snapshot, _ = video_processor.read_snapshot(with_frame=False)
+        if live_snapshot is not None and live_snapshot.frame_index != last_frame_index:
+            render_live_quality(quality_placeholder, live_snapshot, celebrate=False)
+            last_frame_index = live_snapshot.frame_index
+        time.sleep(0.2)
@@ -0,0 +1,259 @@
+# Memory bounds for verifications: a per-process budget that verifications reserve their
+# estimated working memory from (so N concurrent sessions cannot together exceed it), a
+# per-verification budget that caps the working resolution, a pool of reusable scratch
+# buffers, and a tracemalloc report of peak memory per stage.
+#
+#   python memory.py id.jpg selfie.jpg      # per-stage peak/retained memory of one verification
+import argparse
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+MB = 1024 * 1024
+# Working memory all verifications in the process may hold at once (REALEYES_MEMORY_BUDGET_MB;
+# unset: no limit). Models and the result cache are not included.
+PROCESS_BUDGET_BYTES = int(float(os.environ.get("REALEYES_MEMORY_BUDGET_MB", "0")) * MB) or None
+# Working memory of one verification; larger inputs are processed at a lower resolution (REALEYES_VERIFY_MEMORY_MB)
+VERIFY_BUDGET_BYTES = int(float(os.environ.get("REALEYES_VERIFY_MEMORY_MB", "160")) * MB)
+# Longest a verification waits for the process budget before it is rejected (REALEYES_MEMORY_WAIT_SECONDS)
+BUDGET_WAIT_SECONDS = float(os.environ.get("REALEYES_MEMORY_WAIT_SECONDS", "30"))
+# Scratch buffers kept for reuse (REALEYES_BUFFER_POOL_MB)
+BUFFER_POOL_BYTES = int(float(os.environ.get("REALEYES_BUFFER_POOL_MB", "64")) * MB)
+
+# Bytes held per working pixel of an image: RGB, BGR and gray views (7), the normalised card
+# and its views (7), OCR's resized and gray copies and detector maps (~8)
+WORKING_BYTES_PER_PIXEL = 22
+DECODE_BYTES_PER_PIXEL = 3          # the decoded upload, released once the working copy exists
+MIN_WORKING_SIDE = 640              # below this OCR stops reading ID dates reliably
+POOL_GRANULE = MB                   # pooled buffers are allocated in whole MiB
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+# Helper: Estimated peak working memory of one verification whose images are (width, height) pixels
+def estimate_verification_bytes(sizes, max_side, decode_sizes=None):
+    total = 0
+    for index, (width, height) in enumerate(sizes):
+        scale = min(1.0, max_side / max(width, height))
+        total += int(width * height * scale * scale * WORKING_BYTES_PER_PIXEL)
+        decode_w, decode_h = decode_sizes[index] if decode_sizes else (width, height)
+        total += decode_w * decode_h * DECODE_BYTES_PER_PIXEL
+    return total
+
+
+# Helper: Largest working side (at most max_side) whose estimate fits the per-verification budget
+def working_side(sizes, max_side, budget=VERIFY_BUDGET_BYTES, decode_sizes=None):
+    side = max_side
+    while side > MIN_WORKING_SIDE and estimate_verification_bytes(sizes, side, decode_sizes) > budget:
+        side = max(MIN_WORKING_SIDE, int(side * 0.85))
+    return side
+
+
+# Bytes reserved by the verifications in flight, bounded by limit. reserve() blocks until the
+# request fits, so concurrent verifications queue instead of growing RSS past the limit.
+class MemoryBudget:
+    def __init__(self, limit):
+        self.limit = limit
+        self.reserved = 0
+        self.peak = 0
+        self.waits = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes, timeout=BUDGET_WAIT_SECONDS):
+        nbytes = self.acquire(nbytes, timeout)
+        try:
+            yield nbytes
+        finally:
+            self.release(nbytes)
+
+    def acquire(self, nbytes, timeout=BUDGET_WAIT_SECONDS):
+        # Returns the bytes reserved, to be passed to release(). A request larger than the
+        # whole budget runs alone rather than never.
+        nbytes = min(nbytes, self.limit)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self.reserved + nbytes > self.limit:
+                self.waits += 1
+            while self.reserved + nbytes > self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise MemoryBudgetExceeded(
+                        f"Server is at its memory limit ({self.reserved // MB} of {self.limit // MB} MB in use); try again shortly"
+                    )
+                self._cond.wait(remaining)
+            self.reserved += nbytes
+            self.peak = max(self.peak, self.reserved)
+        return nbytes
+
+    def release(self, nbytes):
+        with self._cond:
+            self.reserved -= nbytes
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit_mb': self.limit / MB,
+                'reserved_mb': self.reserved / MB,
+                'peak_mb': self.peak / MB,
+                'waits': self.waits,
+                'rejected': self.rejected,
+            }
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+# Helper: The process-wide budget, or None when REALEYES_MEMORY_BUDGET_MB is unset
+def get_memory_budget():
+    global _budget
+    if PROCESS_BUDGET_BYTES is None:
+        return None
+    with _budget_lock:
+        if _budget is None:
+            _budget = MemoryBudget(PROCESS_BUDGET_BYTES)
+        return _budget
+
+
+# Reusable scratch memory for large short-lived arrays (Laplacians, OCR batch canvases).
+# Buffers are flat byte arrays handed out as views of any shape and dtype that fits, so
+# images of different sizes share them. Buffers returned beyond the pool limit are dropped.
+class BufferPool:
+    def __init__(self, limit=BUFFER_POOL_BYTES):
+        self.limit = limit
+        self._free = []             # idle flat uint8 buffers, smallest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def borrow(self, shape, dtype=np.uint8, zero=False):
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        buffer = self._take(nbytes)
+        array = buffer[:nbytes].view(dtype).reshape(shape)
+        if zero:
+            array.fill(0)
+        try:
+            yield array
+        finally:
+            del array
+            self._give(buffer)
+
+    def _take(self, nbytes):
+        with self._lock:
+            for i, buffer in enumerate(self._free):
+                if buffer.size >= nbytes:
+                    self.hits += 1
+                    return self._free.pop(i)
+            self.misses += 1
+        return np.empty(-(-nbytes // POOL_GRANULE) * POOL_GRANULE, dtype=np.uint8)
+
+    def _give(self, buffer):
+        with self._lock:
+            if buffer.size + sum(b.size for b in self._free) > self.limit:
+                return
+            self._free.append(buffer)
+            self._free.sort(key=lambda b: b.size)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'buffers': len(self._free),
+                'pooled_mb': sum(b.size for b in self._free) / MB,
+                'limit_mb': self.limit / MB,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_pool = BufferPool()
+
+
+def get_buffer_pool():
+    return _pool
+
+
+# Per-stage tracemalloc accounting, active only while tracemalloc is tracing. The peak is
+# process-wide, so figures are exact only when stages run one at a time (as in the report).
+class StageMemoryReport:
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, stage):
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self.stages[stage] = {
+                    'peak_mb': (peak - before) / MB,
+                    'retained_mb': (after - before) / MB,
+                }
+
+    def rows(self):
+        with self._lock:
+            return sorted(self.stages.items(), key=lambda item: -item[1]['peak_mb'])
+
+
+_report = StageMemoryReport()
+
+
+# Helper: Context manager recording a stage's peak memory while tracemalloc is on (near free otherwise)
+def track(stage):
+    return _report.track(stage)
+
+
+# Helper: Run one verification with tracemalloc on and its stages one at a time; returns
+# (result, [(stage, {peak_mb, retained_mb})], overall peak MB)
+def stage_memory_report(id_image, selfie_image, **kwargs):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from engine import verify
+
+    _report.stages.clear()
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result = verify(id_image, selfie_image, executor=executor, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, _report.rows(), peak / MB
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak memory per verification stage (tracemalloc)")
+    parser.add_argument('id', help="ID photo")
+    parser.add_argument('selfie', help="Selfie photo")
+    args = parser.parse_args(argv)
+
+    # Run as a script this file is __main__; the engine records into the imported module
+    import memory
+
+    result, rows, peak = memory.stage_memory_report(args.id, args.selfie)
+    print(f"{'stage':<16}{'peak MB':>10}{'retained MB':>14}")
+    for stage, data in rows:
+        print(f"{stage:<16}{data['peak_mb']:>10.1f}{data['retained_mb']:>14.1f}")
+    print(f"overall peak {peak:.1f} MB; decision: {result.decision} (failed stage: {result.failed_stage})")
+
+
+if __name__ == '__main__':
+    main()
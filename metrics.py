@@ -0,0 +1,162 @@
+# In-process timing metrics: every pipeline stage records its duration into a histogram,
+# exported as Prometheus text or JSON. Disabled with REALEYES_METRICS=0, in which case span()
+# hands back a shared no-op context manager and observe() returns at once.
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.environ.get("REALEYES_METRICS", "1") == "1"
+# Upper bounds in seconds, from a face crop comparison (sub-millisecond) to a cold OCR load
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+STAGE_METRIC = "realeyes_stage_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)     # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = self.max = None
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation, as Prometheus'
+        # histogram_quantile does, kept within the observed min/max
+        if not self.count:
+            return None
+        return min(self.max, max(self.min, self._interpolate(q)))
+
+    def _interpolate(self, q):
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.max
+                low = self.buckets[i - 1] if i else 0.0
+                return low + (self.buckets[i] - low) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}       # stage -> Histogram
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        # {stage: {count, sum_seconds, mean_ms, p50_ms, p95_ms, p99_ms, buckets}} for JSON dumps
+        with self._lock:
+            histograms = {
+                stage: (list(h.counts), h.count, h.sum, {f"p{round(q * 100)}_ms": h.quantile(q) for q in (0.5, 0.95, 0.99)})
+                for stage, h in self._histograms.items()
+            }
+        data = {}
+        for stage, (counts, count, total, quantiles) in sorted(histograms.items()):
+            data[stage] = {
+                'count': count,
+                'sum_seconds': total,
+                'mean_ms': total / count * 1000 if count else None,
+                **{name: value * 1000 if value is not None else None for name, value in quantiles.items()},
+                'buckets': {str(bound): n for bound, n in zip(self.buckets + ('+Inf',), counts)},
+            }
+        return data
+
+    def prometheus_text(self):
+        # Prometheus text exposition format (version 0.0.4), cumulative buckets
+        with self._lock:
+            histograms = {stage: (list(h.counts), h.count, h.sum) for stage, h in self._histograms.items()}
+        lines = [
+            f"# HELP {STAGE_METRIC} Time spent in each verification stage.",
+            f"# TYPE {STAGE_METRIC} histogram",
+        ]
+        for stage, (counts, count, total) in sorted(histograms.items()):
+            label = stage.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f'{STAGE_METRIC}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{STAGE_METRIC}_sum{{stage="{label}"}} {total}')
+            lines.append(f'{STAGE_METRIC}_count{{stage="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def get_registry():
+    return _registry
+
+
+def set_enabled(enabled):
+    global METRICS_ENABLED
+    METRICS_ENABLED = bool(enabled)
+
+
+# Helper: Record a duration (seconds) for a stage
+def observe(stage, seconds):
+    if METRICS_ENABLED:
+        _registry.observe(stage, seconds)
+
+
+# Helper: Record every stage of a result's timings_ms
+def observe_timings(timings_ms):
+    if METRICS_ENABLED:
+        for stage, ms in timings_ms.items():
+            _registry.observe(stage, ms / 1000)
+
+
+@contextmanager
+def _timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe(stage, time.perf_counter() - start)
+
+
+# Helper: Context manager timing its block into the stage's histogram (failures included)
+def span(stage):
+    return _timed(stage) if METRICS_ENABLED else _NOOP_SPAN
+
+
+def snapshot():
+    return _registry.snapshot()
+
+
+def prometheus_text():
+    return _registry.prometheus_text()
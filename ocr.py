@@ -0,0 +1,247 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from memory import get_buffer_pool
+from metrics import observe
+
+# Number of EasyOCR readers kept per language set (REALEYES_OCR_POOL_SIZE)
+DEFAULT_POOL_SIZE = int(os.environ.get("REALEYES_OCR_POOL_SIZE", "2"))
+# Longest side of the copy text detection runs on (REALEYES_OCR_DETECT_MAX_SIDE)
+DETECT_MAX_SIDE = int(os.environ.get("REALEYES_OCR_DETECT_MAX_SIDE", "1280"))
+# Local EasyOCR weights (REALEYES_OCR_MODEL_DIR). Readers never download at runtime;
+# `python warmup.py --prefetch` fills the directory at build or deploy time.
+OCR_MODEL_DIR = os.environ.get("REALEYES_OCR_MODEL_DIR", os.path.join("models", "easyocr"))
+WARMUP_WAIT_SECONDS = 30        # longest warm_up() waits for a busy reader
+
+
+# Pool of EasyOCR readers for one language set, shared by every session in the process.
+# Readers are created lazily up to `size`; callers borrow one through `reader()`.
+class ReaderPool:
+    def __init__(self, languages, size=DEFAULT_POOL_SIZE, gpu=False):
+        self.languages = tuple(languages)
+        self.size = max(1, int(size))
+        self.gpu = gpu
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            'model_load_seconds': [],
+            'warmup_seconds': None,
+            'acquisitions': 0,
+            'acquire_wait_seconds': 0.0,
+        }
+
+    def _load_reader(self):
+        import easyocr
+
+        start = time.perf_counter()
+        try:
+            reader = easyocr.Reader(
+                list(self.languages), gpu=self.gpu, model_storage_directory=OCR_MODEL_DIR, download_enabled=False
+            )
+        except FileNotFoundError as e:
+            raise FileNotFoundError(
+                f"{e} (EasyOCR weights are loaded from {OCR_MODEL_DIR}; run `python warmup.py --prefetch` to download them)"
+            ) from e
+        elapsed = time.perf_counter() - start
+        observe('ocr_load', elapsed)
+        with self._lock:
+            self._metrics['model_load_seconds'].append(elapsed)
+        return reader
+
+    def _acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+
+        if create:
+            try:
+                return self._load_reader()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # Pool is full: wait for another session to hand a reader back
+        return self._idle.get(timeout=timeout)
+
+    @contextmanager
+    def reader(self, timeout=None):
+        start = time.perf_counter()
+        reader = self._acquire(timeout)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._metrics['acquisitions'] += 1
+            self._metrics['acquire_wait_seconds'] += waited
+        try:
+            yield reader
+        finally:
+            self._idle.put(reader)
+
+    def warm_up(self, count=1, timeout=WARMUP_WAIT_SECONDS):
+        # Load `count` readers and push one dummy image through each. When every reader is
+        # busy for `timeout` seconds the others are in use, and so already warm: stop there.
+        start = time.perf_counter()
+        dummy = np.full((64, 256, 3), 255, dtype=np.uint8)
+        borrowed = []
+        try:
+            for _ in range(min(max(1, count), self.size)):
+                try:
+                    reader = self._acquire(timeout)
+                except queue.Empty:
+                    break
+                borrowed.append(reader)
+                reader.readtext(dummy, detail=0)
+        finally:
+            for reader in borrowed:
+                self._idle.put(reader)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._metrics['warmup_seconds'] = elapsed
+        return elapsed
+
+    def stats(self):
+        with self._lock:
+            loads = list(self._metrics['model_load_seconds'])
+            return {
+                'languages': list(self.languages),
+                'pool_size': self.size,
+                'readers_loaded': self._created,
+                'readers_idle': self._idle.qsize(),
+                'model_load_seconds': loads,
+                'model_load_seconds_total': sum(loads),
+                'warmup_seconds': self._metrics['warmup_seconds'],
+                'acquisitions': self._metrics['acquisitions'],
+                'acquire_wait_seconds': self._metrics['acquire_wait_seconds'],
+            }
+
+
+# Helper: Text boxes (x_min, y_min, x_max, y_max) in image coordinates, detected on a downscaled copy
+def detect_text_boxes(reader, img, max_side=DETECT_MAX_SIDE):
+    scale = min(1.0, max_side / max(img.shape[:2]))
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else img
+    horizontal_list, free_list = reader.detect(small)
+
+    boxes = []
+    for x_min, x_max, y_min, y_max in horizontal_list[0]:
+        boxes.append((x_min, y_min, x_max, y_max))
+    for points in free_list[0]:
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        boxes.append((min(xs), min(ys), max(xs), max(ys)))
+
+    height, width = img.shape[:2]
+    return [
+        (max(0, int(x0 / scale)), max(0, int(y0 / scale)), min(width, int(x1 / scale)), min(height, int(y1 / scale)))
+        for x0, y0, x1, y1 in boxes
+    ]
+
+
+# Helper: (x_min, y_min, x_max, y_max) of an EasyOCR point list
+def box_bounds(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))
+
+
+# Helper: Recognise only the given boxes; returns (box, text, confidence) tuples
+def recognize_boxes(reader, img, boxes):
+    if not boxes:
+        return []
+    horizontal_list = [[x0, x1, y0, y1] for x0, y0, x1, y1 in boxes]
+    results = reader.recognize(img, horizontal_list=horizontal_list, free_list=[], detail=1, paragraph=False)
+    return [(box_bounds(points), text, float(confidence)) for points, text, confidence in results]
+
+
+# Helper: detect_text_boxes for several images with one detector forward pass. Downscaled
+# copies are padded (bottom/right, so coordinates are unchanged) to a common size.
+def detect_text_boxes_batch(reader, images, max_side=DETECT_MAX_SIDE):
+    if len(images) == 1:
+        return [detect_text_boxes(reader, images[0], max_side)]
+    scales, smalls = [], []
+    for img in images:
+        scale = min(1.0, max_side / max(img.shape[:2]))
+        scales.append(scale)
+        smalls.append(cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else img)
+    height = max(s.shape[0] for s in smalls)
+    width = max(s.shape[1] for s in smalls)
+    with get_buffer_pool().borrow((len(smalls), height, width, 3), np.uint8, zero=True) as canvas:
+        for slot, small in zip(canvas, smalls):
+            slot[:small.shape[0], :small.shape[1]] = small
+        horizontal_lists, free_lists = reader.detect(canvas, reformat=False)
+
+    results = []
+    for img, small, scale, horizontal, free in zip(images, smalls, scales, horizontal_lists, free_lists):
+        boxes = [(x_min, y_min, x_max, y_max) for x_min, x_max, y_min, y_max in horizontal]
+        boxes += [box_bounds(points) for points in free]
+        img_height, img_width = img.shape[:2]
+        results.append([
+            (max(0, int(x0 / scale)), max(0, int(y0 / scale)),
+             min(img_width, int(x1 / scale)), min(img_height, int(y1 / scale)))
+            for x0, y0, x1, y1 in boxes
+            if x0 < small.shape[1] and y0 < small.shape[0]     # drop boxes found in the padding
+        ])
+    return results
+
+
+# Helper: recognize_boxes for several images with one recogniser call. The gray images are
+# stacked into one tall mosaic so every crop goes through the same batched forward passes.
+def recognize_boxes_batch(reader, images, boxes_per_image, batch_size=32):
+    if len(images) == 1:
+        return [recognize_boxes(reader, images[0], boxes_per_image[0])]
+    grays = [img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_RGB2GRAY) for img in images]
+    offsets = np.cumsum([0] + [g.shape[0] for g in grays])
+    horizontal_list = []
+    for top, boxes in zip(offsets, boxes_per_image):
+        horizontal_list += [[x0, x1, y0 + top, y1 + top] for x0, y0, x1, y1 in boxes]
+
+    results = [[] for _ in images]
+    if not horizontal_list:
+        return results
+    with get_buffer_pool().borrow((int(offsets[-1]), max(g.shape[1] for g in grays)), np.uint8, zero=True) as mosaic:
+        for gray, top in zip(grays, offsets):
+            mosaic[top:top + gray.shape[0], :gray.shape[1]] = gray
+        recognised = reader.recognize(
+            mosaic, horizontal_list=horizontal_list, free_list=[], detail=1, paragraph=False, batch_size=batch_size
+        )
+    for points, text, confidence in recognised:
+        x0, y0, x1, y1 = box_bounds(points)
+        slot = int(np.searchsorted(offsets, y0, side='right')) - 1
+        top = int(offsets[slot])
+        results[slot].append(((x0, y0 - top, x1, y1 - top), text, float(confidence)))
+    return results
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# Helper: Get the process-wide reader pool for a language set
+def get_reader_pool(languages=('en',), size=None, gpu=False):
+    # Keyed on the caller's order, which EasyOCR treats as priority, so ('hi', 'en') and
+    # ('en', 'hi') get readers of their own
+    key = (tuple(languages), gpu)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ReaderPool(languages, size=size or DEFAULT_POOL_SIZE, gpu=gpu)
+            _pools[key] = pool
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
@@ -0,0 +1,163 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from ocr import DETECT_MAX_SIDE, detect_text_boxes_batch, get_reader_pool, recognize_boxes_batch
+
+# Batch OCR jobs from concurrent verifications (REALEYES_OCR_BATCHING=1 to enable)
+OCR_BATCHING = os.environ.get("REALEYES_OCR_BATCHING", "0") == "1"
+# Largest batch and longest wait for it to fill (REALEYES_OCR_MAX_BATCH, REALEYES_OCR_MAX_WAIT_MS)
+DEFAULT_MAX_BATCH = int(os.environ.get("REALEYES_OCR_MAX_BATCH", "8"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("REALEYES_OCR_MAX_WAIT_MS", "15"))
+RECOGNIZE_BATCH_SIZE = 32       # text crops per recogniser forward pass
+
+
+class _Job:
+    __slots__ = ('image', 'select', 'boxes', 'future', 'submitted')
+
+    def __init__(self, image, select, boxes=None):
+        self.image = image
+        self.select = select
+        self.boxes = boxes
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+# Collects OCR jobs from concurrent callers for up to max_wait_ms (or until max_batch are
+# waiting), then runs detection and recognition for the whole batch with one pooled reader
+# and hands each caller its own (box, text, confidence) results. One scheduler thread runs per
+# reader in the pool, so while one batch holds a reader the next batch fills and runs on
+# another idle one.
+class OcrBatcher:
+    def __init__(self, languages=('en',), max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 detect_max_side=DETECT_MAX_SIDE, workers=None):
+        self.languages = tuple(languages)
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_ms = max_wait_ms
+        self.detect_max_side = detect_max_side
+        self.workers = max(1, int(workers or get_reader_pool(self.languages).size))
+        self._jobs = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._metrics = {
+            'jobs': 0,
+            'batches': 0,
+            'batch_sizes': {},
+            'queue_wait_seconds': 0.0,
+            'max_queue_wait_seconds': 0.0,
+            'run_seconds': 0.0,
+            'errors': 0,
+        }
+
+    def _ensure_threads(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._loop, name=f"ocr-batcher-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, image, select=None, boxes=None):
+        # select(boxes) -> boxes narrows the detected boxes before recognition (None: all);
+        # boxes skips detection and recognises exactly those (x0, y0, x1, y1) boxes
+        job = _Job(image, select, None if boxes is None else list(boxes))
+        self._ensure_threads()
+        self._jobs.put(job)
+        return job.future
+
+    def read(self, image, select=None, timeout=None, boxes=None):
+        return self.submit(image, select, boxes).result(timeout)
+
+    def _collect(self):
+        batch = [self._jobs.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._jobs.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                results = self._run(batch)
+            except Exception as e:
+                with self._lock:
+                    self._metrics['errors'] += 1
+                for job in batch:
+                    job.future.set_exception(e)
+                continue
+            self._record(batch, started, time.perf_counter())
+            for job, result in zip(batch, results):
+                job.future.set_result(result)
+
+    def _run(self, batch):
+        images = [job.image for job in batch]
+        to_detect = [job.image for job in batch if job.boxes is None]
+        with get_reader_pool(self.languages).reader() as reader:
+            detected = iter(detect_text_boxes_batch(reader, to_detect, self.detect_max_side) if to_detect else ())
+            selected = []
+            for job in batch:
+                if job.boxes is not None:
+                    selected.append(job.boxes)
+                else:
+                    boxes = next(detected)
+                    selected.append(job.select(boxes) if job.select else boxes)
+            return recognize_boxes_batch(reader, images, selected, RECOGNIZE_BATCH_SIZE)
+
+    def _record(self, batch, started, finished):
+        waits = [started - job.submitted for job in batch]
+        with self._lock:
+            m = self._metrics
+            m['jobs'] += len(batch)
+            m['batches'] += 1
+            m['batch_sizes'][len(batch)] = m['batch_sizes'].get(len(batch), 0) + 1
+            m['queue_wait_seconds'] += sum(waits)
+            m['max_queue_wait_seconds'] = max(m['max_queue_wait_seconds'], max(waits))
+            m['run_seconds'] += finished - started
+
+    def stats(self):
+        with self._lock:
+            m = dict(self._metrics)
+            m['batch_sizes'] = dict(m['batch_sizes'])
+        jobs, batches = m['jobs'], m['batches']
+        m.update(
+            languages=list(self.languages),
+            max_batch=self.max_batch,
+            max_wait_ms=self.max_wait_ms,
+            workers=self.workers,
+            queued=self._jobs.qsize(),
+            mean_batch_size=jobs / batches if batches else None,
+            mean_queue_wait_ms=m['queue_wait_seconds'] / jobs * 1000 if jobs else None,
+            mean_batch_ms=m['run_seconds'] / batches * 1000 if batches else None,
+            jobs_per_busy_second=jobs / m['run_seconds'] if m['run_seconds'] else None,
+        )
+        return m
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+# Helper: Process-wide batcher for a language list, in priority order like get_reader_pool
+def get_ocr_batcher(languages=('en',)):
+    key = tuple(languages)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = _batchers[key] = OcrBatcher(languages)
+        return batcher
+
+
+def batcher_stats():
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    return [batcher.stats() for batcher in batchers]
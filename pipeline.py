@@ -0,0 +1,98 @@
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+# Threads shared by the stages of all verifications in the process (REALEYES_STAGE_THREADS)
+STAGE_THREADS = int(os.environ.get("REALEYES_STAGE_THREADS", "4"))
+
+
+# Small dependency graph of pipeline stages. A node is submitted to the thread pool as soon as
+# every node it runs after has finished, and receives their values as arguments, so
+# independent nodes (OCR on the ID, face detection on both images) run concurrently. A node
+# whose dependency raised fails with the same exception without running. Once cancel() is
+# called (the caller has what it needs) nodes that have not started yet are cancelled.
+class StageGraph:
+    def __init__(self, executor=None):
+        self.executor = executor or get_stage_executor()
+        self.cancelled = False
+        self._nodes = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, fn, after=()):
+        if name in self._nodes:
+            raise ValueError(f"Duplicate stage: {name}")
+        missing = [dep for dep in after if dep not in self._nodes]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stage(s): {', '.join(missing)}")
+        self._nodes[name] = (fn, tuple(after))
+        self._futures[name] = Future()
+        return self._futures[name]
+
+    def run(self):
+        # Start the graph; returns {name: Future}
+        for name, (_, after) in self._nodes.items():
+            if not after:
+                self._submit(name)
+            else:
+                remaining = {'count': len(after)}
+                for dep in after:
+                    self._futures[dep].add_done_callback(lambda _, name=name, remaining=remaining: self._ready(name, remaining))
+        return dict(self._futures)
+
+    def cancel(self):
+        # Nodes still waiting for their dependencies are cancelled now; nodes queued on the
+        # executor are cancelled when they reach a thread. Running nodes finish.
+        self.cancelled = True
+        for future in self._futures.values():
+            future.cancel()
+
+    def _ready(self, name, remaining):
+        with self._lock:
+            remaining['count'] -= 1
+            if remaining['count']:
+                return
+        self._submit(name)
+
+    def _submit(self, name):
+        fn, after = self._nodes[name]
+        target = self._futures[name]
+        if self.cancelled:
+            target.cancel()
+        if not target.set_running_or_notify_cancel():
+            return
+        for dep in after:
+            error = self._futures[dep].exception() if not self._futures[dep].cancelled() else None
+            if self._futures[dep].cancelled() or error is not None:
+                target.set_exception(error or RuntimeError(f"Stage {dep} was cancelled"))
+                return
+        args = [self._futures[dep].result() for dep in after]
+
+        def call():
+            if self.cancelled:
+                target.set_exception(CancelledError(f"Stage {name} was cancelled"))
+                return
+            try:
+                target.set_result(fn(*args))
+            except BaseException as e:
+                target.set_exception(e)
+
+        try:
+            self.executor.submit(call)
+        except RuntimeError as e:
+            # The executor has been shut down (e.g. at interpreter exit): the node fails
+            # instead of the error escaping from a done-callback and leaving it unresolved
+            target.set_exception(e)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# Helper: Process-wide thread pool the pipeline stages run on
+def get_stage_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, STAGE_THREADS), thread_name_prefix="stage")
+        return _executor
@@ -0,0 +1,130 @@
+# Sampling profiler for one thread (the webcam worker running VideoProcessor.recv). A daemon
+# thread reads the target thread's Python stack every few milliseconds through
+# sys._current_frames(); nothing runs on the profiled thread itself, so it can be started and
+# stopped on a live session. Samples aggregate into flamegraph.pl / speedscope collapsed stacks
+# and into a per-operation table keyed by the innermost source line (usually one cv2 call).
+import linecache
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Sampling interval (REALEYES_PROFILE_INTERVAL_MS)
+DEFAULT_INTERVAL_MS = float(os.environ.get("REALEYES_PROFILE_INTERVAL_MS", "5"))
+MAX_STACK_DEPTH = 64
+
+
+def _frame_label(frame):
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+
+
+def _line_label(filename, lineno):
+    source = linecache.getline(filename, lineno).strip()
+    return f"{os.path.basename(filename)}:{lineno} {source}"
+
+
+class ThreadSampler:
+    # focus: function name a sample must be inside to count (e.g. "recv"); stacks are cut to
+    # start there. Samples outside it, with the thread waiting for the next frame, count as idle.
+    def __init__(self, thread_id, interval_ms=DEFAULT_INTERVAL_MS, focus=None, max_depth=MAX_STACK_DEPTH):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.focus = focus
+        self.max_depth = max_depth
+        self.stacks = Counter()         # tuple of frame labels, outermost first -> samples
+        self.lines = Counter()          # (filename, lineno) of the innermost frame -> samples
+        self.samples = 0
+        self.idle = 0
+        self.started = None
+        self.stopped = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()      # the counters are read while sampling continues
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="recv-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.perf_counter()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue        # the thread has exited or not started yet
+            self._sample(frame)
+
+    def _sample(self, frame):
+        innermost = (frame.f_code.co_filename, frame.f_lineno)
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(frame)
+            if self.focus is not None and frame.f_code.co_name == self.focus:
+                break
+            frame = frame.f_back
+        else:
+            if self.focus is not None:
+                with self._lock:
+                    self.idle += 1
+                return
+        key = tuple(_frame_label(f) for f in reversed(stack))
+        with self._lock:
+            self.samples += 1
+            self.stacks[key] += 1
+            self.lines[innermost] += 1
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.stopped or time.perf_counter()) - self.started
+
+    def collapsed(self):
+        # One "outer;...;inner count" line per distinct stack, for flamegraph.pl or speedscope
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks)
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+
+    def operation_table(self, frames=None, top=20):
+        # Rows of {operation, samples, percent, ms_per_frame}: time attributed to each innermost
+        # source line. ms_per_frame estimates each sample as the mean time between samples.
+        with self._lock:
+            total = self.samples + self.idle
+            lines = self.lines.most_common(top)
+        period_ms = self.elapsed / total * 1000 if total else self.interval * 1000
+        rows = []
+        for (filename, lineno), count in lines:
+            rows.append({
+                'operation': _line_label(filename, lineno),
+                'samples': count,
+                'percent': 100 * count / total if total else 0.0,
+                'ms_per_frame': count * period_ms / frames if frames else None,
+            })
+        return rows
+
+    def summary(self, frames=None):
+        total = self.samples + self.idle
+        return {
+            'seconds': self.elapsed,
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'idle_samples': self.idle,
+            'busy_percent': 100 * self.samples / total if total else 0.0,
+            'frames': frames,
+        }
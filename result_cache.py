@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Cache limits (REALEYES_CACHE_MAX_ENTRIES, REALEYES_CACHE_MAX_MB, REALEYES_CACHE_TTL seconds)
+DEFAULT_MAX_ENTRIES = int(os.environ.get("REALEYES_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("REALEYES_CACHE_MAX_MB", "256")) * 1024 * 1024)
+DEFAULT_TTL_SECONDS = float(os.environ.get("REALEYES_CACHE_TTL", "900"))
+
+_MISSING = object()
+
+
+# Helper: Content digest of uploaded bytes or a decoded image array
+def content_digest(data):
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(data, np.ndarray):
+        h.update(f"{data.shape}{data.dtype}".encode())
+        data = np.ascontiguousarray(data)
+    h.update(memoryview(data).cast('B'))
+    return h.hexdigest()
+
+
+# Helper: Rough in-memory size of a cached value. Arrays count the buffer they keep alive,
+# once however many views of it the value holds; shared objects are counted once too.
+def estimate_size(value, _seen=None):
+    seen = set() if _seen is None else _seen
+    if isinstance(value, np.ndarray):
+        base = value
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if id(base) in seen:
+            return 0
+        seen.add(id(base))
+        return base.nbytes
+    if isinstance(value, (list, tuple, dict)) or hasattr(value, '__dict__'):
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v, seen) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + estimate_size(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+def _freeze(value):
+    # Cached arrays are shared between reruns, so nobody may write into them. Arrays are
+    # replaced by read-only views: the caller's own arrays stay writeable.
+    if isinstance(value, np.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        return type(value)(*(_freeze(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return type(value)(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _freeze(v) for k, v in value.items()}
+    if hasattr(value, '__dict__'):
+        attributes = vars(value)
+        for name, v in list(attributes.items()):
+            attributes[name] = _freeze(v)
+    return value
+
+
+# LRU + TTL cache for per-stage pipeline results, bounded by entry count and bytes.
+# Keys are (stage, key) where key is built from content digests of the inputs.
+class StageCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, stage, field):
+        stage_stats = self._stats.setdefault(stage, {'hits': 0, 'misses': 0})
+        stage_stats[field] += 1
+
+    def _drop(self, full_key):
+        _, size, _ = self._entries.pop(full_key)
+        self._bytes -= size
+
+    def get(self, stage, key, default=None):
+        full_key = (stage, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None or entry[2] < now:
+                if entry is not None:
+                    self._drop(full_key)
+                self._count(stage, 'misses')
+                return default
+            self._entries.move_to_end(full_key)
+            self._count(stage, 'hits')
+            return entry[0]
+
+    def put(self, stage, key, value):
+        full_key = (stage, key)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return value
+        value = _freeze(value)
+        with self._lock:
+            if full_key in self._entries:
+                self._drop(full_key)
+            self._entries[full_key] = (value, size, time.monotonic() + self.ttl_seconds)
+            self._bytes += size
+            self._evict()
+        return value
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [k for k, (_, _, expires) in self._entries.items() if expires < now]
+        for k in expired:
+            self._drop(k)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+
+    def get_or_compute(self, stage, key, compute):
+        value = self.get(stage, key, _MISSING)
+        if value is _MISSING:
+            value = self.put(stage, key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'stages': {stage: dict(s) for stage, s in self._stats.items()},
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Helper: Process-wide cache shared by all Streamlit sessions
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = StageCache()
+        return _cache
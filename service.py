@@ -0,0 +1,332 @@
+# HTTP verification service: an asyncio front end that parses requests and hands the OCR/CV
+# work to a bounded pool of worker processes, each with its models loaded once.
+#
+#   python service.py --port 8080 --workers 4
+#
+#   POST /verify   multipart/form-data with files "id" and "selfie" (and optional "live_capture"),
+#                  or JSON {"id": <base64>, "selfie": <base64>, "live_capture": false}
+#   GET  /health   readiness, queue depth and counters
+#   GET  /metrics  per-stage latency histograms as Prometheus text (?format=json for JSON)
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qs
+
+from batch_verify import RETRY_STAGES, is_final, json_default
+from detectors import get_face_cascade
+from embeddings import get_embedder
+from engine import OCR_LANGUAGES, verify
+import metrics
+from ocr import get_reader_pool
+from result_cache import get_result_cache
+from warmup import WarmUp
+
+# Largest request body accepted (REALEYES_SERVICE_MAX_BODY_MB)
+MAX_BODY_BYTES = int(float(os.environ.get("REALEYES_SERVICE_MAX_BODY_MB", "20")) * 1024 * 1024)
+MAX_HEADER_BYTES = 64 * 1024
+QUEUE_PER_WORKER = 2            # requests waiting per worker before new ones get 429
+RETRY_AFTER_SECONDS = 1
+READY_HOLD_SECONDS = 0.05      # how long each startup probe occupies a worker
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None, payload=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+        self.payload = payload or {}     # extra response fields next to 'error'
+
+
+def _init_worker(warm_up):
+    # Load the OCR reader, face cascade and embedding model once per worker process, and with
+    # warm_up push a dummy input through each of them and the pipeline
+    get_reader_pool(OCR_LANGUAGES, size=1)
+    if warm_up:
+        for name, step in WarmUp(OCR_LANGUAGES).run().status()['steps'].items():
+            if step['status'] == 'failed':
+                print(f"Worker {os.getpid()}: warm-up step {name} failed: {step['error']}", file=sys.stderr)
+    else:
+        get_face_cascade()
+        get_embedder()
+
+
+def _ready(hold=0.0):
+    # Holding the worker briefly lets the other workers pick up the remaining probes
+    time.sleep(hold)
+    return os.getpid()
+
+
+# Run one verification in a worker process; the worker's own StageCache serves retries
+def verify_request(id_bytes, selfie_bytes, live_capture=False):
+    start = time.perf_counter()
+    result = verify(id_bytes, selfie_bytes, live_capture=live_capture, cache=get_result_cache()).to_dict()
+    result['timings_ms']['worker_total'] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def _truthy(value):
+    if isinstance(value, bytes):
+        value = value.decode(errors='replace')
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Helper: (id bytes, selfie bytes, live_capture) from a multipart or JSON request body
+def parse_verify_request(content_type, body):
+    if content_type.startswith('multipart/form-data'):
+        message = BytesParser(policy=HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body
+        )
+        if not message.is_multipart():
+            raise HttpError(400, "Malformed multipart body")
+        fields = {
+            part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.iter_parts()
+        }
+    elif content_type.startswith('application/json'):
+        try:
+            data = json.loads(body)
+            if not isinstance(data, dict):
+                raise HttpError(400, "JSON body must be an object")
+            fields = {key: base64.b64decode(data[key], validate=True) for key in ('id', 'selfie') if key in data}
+        except (ValueError, TypeError, binascii.Error) as e:
+            raise HttpError(400, f"Invalid JSON body: {e}")
+        fields['live_capture'] = data.get('live_capture', False)
+    else:
+        raise HttpError(400, "Content-Type must be multipart/form-data or application/json")
+
+    missing = [name for name in ('id', 'selfie') if not fields.get(name)]
+    if missing:
+        raise HttpError(400, f"Missing image field(s): {', '.join(missing)}")
+    return fields['id'], fields['selfie'], _truthy(fields.get('live_capture', False))
+
+
+class VerificationService:
+    def __init__(self, workers, max_pending=None, warm_up=True):
+        self.workers = workers
+        self.max_pending = max_pending or workers * (1 + QUEUE_PER_WORKER)
+        self.warm_up = warm_up
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(warm_up,))
+        self.pending = 0            # only touched from the event loop thread
+        self.ready = False
+        self.counters = {
+            'requests': 0, 'completed': 0, 'rejected_busy': 0, 'stage_errors': 0, 'errors': 0, 'restarts': 0,
+        }
+        self._starting = None
+
+    async def start(self):
+        # Start every worker (running its initializer) before accepting traffic. Probes are
+        # sent until each worker process has answered one: a worker that finished loading
+        # first could otherwise answer them all while the others are still warming up.
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        pids = set()
+        while len(pids) < self.workers:
+            pids.update(await asyncio.gather(
+                *(loop.run_in_executor(executor, _ready, READY_HOLD_SECONDS) for _ in range(self.workers))
+            ))
+        if executor is self.executor:
+            self.ready = True
+
+    def _restart(self, broken):
+        # A worker died (killed, out of memory) and took the pool with it: replace the pool,
+        # unless a concurrent request already did, and warm up its workers in the background
+        if broken is not self.executor:
+            return
+        self.counters['restarts'] += 1
+        self.ready = False
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.warm_up,)
+        )
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._starting = asyncio.ensure_future(self.start())
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def verify(self, content_type, body):
+        if self.pending >= self.max_pending:
+            self.counters['rejected_busy'] += 1
+            raise HttpError(429, "Verification queue is full", {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        start = time.perf_counter()
+        id_bytes, selfie_bytes, live_capture = parse_verify_request(content_type, body)
+
+        self.pending += 1
+        executor = self.executor
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, verify_request, id_bytes, selfie_bytes, live_capture)
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise HttpError(503, "A worker process exited; workers are restarting",
+                            {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        finally:
+            self.pending -= 1
+
+        timings = result['timings_ms']
+        timings['total'] = round((time.perf_counter() - start) * 1000, 2)
+        timings['queue'] = round(max(0.0, timings['total'] - timings['worker_total']), 2)
+        # Stages run in the worker processes; their timings are recorded here, where /metrics reads them
+        metrics.observe_timings(timings)
+        if not is_final(result):
+            # OCR, comparison and memory failures say nothing about the applicant (missing
+            # EasyOCR weights, a full memory budget): the caller retries rather than reading
+            # them as a rejection, as batch_verify.py does when it resumes
+            self.counters['stage_errors'] += 1
+            failed = [name for name in RETRY_STAGES if name in result['errors']]
+            result['decision'] = 'ERROR'
+            raise HttpError(503, f"Verification could not finish ({', '.join(failed)} failed); retry later",
+                            {'Retry-After': str(RETRY_AFTER_SECONDS)}, result)
+        self.counters['completed'] += 1
+        return result
+
+    def health(self):
+        return {
+            'status': 'ok' if self.ready else 'starting',
+            'workers': self.workers,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'counters': dict(self.counters),
+        }
+
+    async def route(self, method, path, headers, body):
+        path, _, query = path.partition('?')
+        if path == '/metrics':
+            if method != 'GET':
+                raise HttpError(405, "Use GET")
+            if parse_qs(query).get('format') == ['json']:
+                return 200, metrics.snapshot()
+            return 200, metrics.prometheus_text()
+        if path == '/health':
+            if method != 'GET':
+                raise HttpError(405, "Use GET")
+            return (200 if self.ready else 503), self.health()
+        if path == '/verify':
+            if method != 'POST':
+                raise HttpError(405, "Use POST")
+            if not self.ready:
+                raise HttpError(503, "Workers are still loading models", {'Retry-After': str(RETRY_AFTER_SECONDS)})
+            return 200, await self.verify(headers.get('content-type', ''), body)
+        raise HttpError(404, f"No route for {path}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            await _respond(writer, 431, {'error': STATUS_TEXT[431]}, keep_alive=False)
+            return False
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, version = lines[0].split(' ', 2)
+        except ValueError:
+            await _respond(writer, 400, {'error': "Malformed request line"}, keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+        self.counters['requests'] += 1
+        try:
+            if 'transfer-encoding' in headers:
+                raise HttpError(411, "Chunked bodies are not supported; send Content-Length")
+            length = int(headers.get('content-length', '0') or 0)
+            if length > MAX_BODY_BYTES:
+                keep_alive = False     # the body is not read, so the connection cannot be reused
+                raise HttpError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+            body = await reader.readexactly(length) if length else b''
+            status, payload = await self.route(method, path, headers, body)
+            extra = {}
+        except HttpError as e:
+            status, payload, extra = e.status, {'error': str(e), **e.payload}, e.headers
+        except ValueError as e:
+            status, payload, extra = 400, {'error': str(e)}, {}
+        except Exception as e:
+            self.counters['errors'] += 1
+            status, payload, extra = 500, {'error': f"{type(e).__name__}: {e}"}, {}
+        await _respond(writer, status, payload, keep_alive, extra)
+        return keep_alive
+
+
+async def _respond(writer, status, payload, keep_alive=True, headers=None):
+    # Text payloads are Prometheus exposition; everything else is JSON
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), PROMETHEUS_CONTENT_TYPE
+    else:
+        body, content_type = json.dumps(payload, default=json_default).encode(), "application/json"
+    lines = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+
+async def serve(host, port, workers, max_pending=None, warm_up=True):
+    service = VerificationService(workers, max_pending, warm_up)
+    server = await asyncio.start_server(service.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    print(f"Loading models in {workers} worker(s)...", file=sys.stderr)
+    try:
+        await service.start()
+        print(f"Serving on http://{host}:{port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve RealEyes ID + selfie verification over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--max-pending', type=int, help="Requests in flight before 429 (default: workers * 3)")
+    parser.add_argument('--no-warm-up', action='store_true', help="Skip the dummy inferences in each worker")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, max(1, args.workers), args.max_pending, not args.no_warm_up))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
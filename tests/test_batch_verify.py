@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from batch_verify import completed_pairs, is_final
+
+
+@pytest.mark.parametrize('row, expected', [
+    ({'decision': 'APPROVED', 'errors': {}}, True),
+    ({'decision': 'REJECTED', 'errors': {'face': 'No face found in the selfie'}}, True),     # gate decision
+    ({'decision': 'REJECTED', 'errors': {'ocr': 'EasyOCR is not installed'}}, False),
+    ({'decision': 'REJECTED', 'errors': {'compare': 'embedding failed'}}, False),
+    ({'decision': 'REJECTED', 'errors': {'memory': 'timed out waiting for memory'}}, False),
+    ({'decision': 'ERROR', 'error': 'OSError: unreadable'}, False),
+    ({'decision': 'APPROVED'}, True),
+])
+def test_is_final(row, expected):
+    assert is_final(row) is expected
+
+
+def test_completed_pairs_keeps_the_last_row_per_pair(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    rows = [
+        {'pair_id': 'a', 'decision': 'ERROR'},
+        {'pair_id': 'b', 'decision': 'APPROVED', 'errors': {}},
+        {'pair_id': 'a', 'decision': 'REJECTED', 'errors': {}},                 # retry decided it
+        {'pair_id': 'c', 'decision': 'APPROVED', 'errors': {}},
+        {'pair_id': 'c', 'decision': 'REJECTED', 'errors': {'ocr': 'failed'}},  # later failure reopens it
+    ]
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows) + '{"pair_id": "d", "deci', encoding='utf-8')
+    assert completed_pairs(str(path)) == {'a', 'b'}
+
+
+def test_completed_pairs_without_an_output_file(tmp_path):
+    assert completed_pairs(str(tmp_path / 'missing.jsonl')) == set()
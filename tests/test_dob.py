@@ -0,0 +1,87 @@
+from datetime import date
+
+import pytest
+
+from dob import age_from_dob, best_dob, date_candidates, parse_date, token_kinds
+
+TODAY = date(2024, 6, 15)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('12/03/1990', date(1990, 3, 12)),          # day first
+    ('03/25/1990', date(1990, 3, 25)),          # only month first is valid
+    ('1990-03-12', date(1990, 3, 12)),          # ISO
+    ('१२/०३/१९९०', date(1990, 3, 12)),          # Devanagari digits
+    (' 5.6.1985 ', date(1985, 6, 5)),
+    ('31/02/1990', None),
+    ('12/03/90', None),
+    ('DOB 12/03/1990', None),                   # only whole dates parse
+])
+def test_parse_date(text, expected):
+    assert parse_date(text) == expected
+
+
+def test_token_kinds():
+    assert token_kinds("DOB: 12/03/1990") == {'dob', 'date'}
+    assert token_kinds("Issue Date") == {'other'}
+    assert token_kinds("जन्म तिथि") == {'dob'}
+    assert token_kinds("GOVERNMENT OF INDIA") == set()
+
+
+def test_dob_label_outranks_an_earlier_issue_date():
+    lines = ["Issue Date: 01/02/2015", "Name: Asha Verma", "DOB: 12/03/1990"]
+    assert best_dob(lines, TODAY).text == "12/03/1990"
+
+
+def test_label_on_the_line_above_binds_through_boxes():
+    results = [
+        ((10, 50, 60, 70), "DOB", 0.9),
+        ((10, 80, 120, 100), "12/03/1990", 0.8),
+        ((300, 50, 400, 70), "Expiry", 0.9),
+        ((300, 80, 410, 100), "01/01/2020", 0.9),
+    ]
+    candidate = best_dob(results, TODAY)
+    assert candidate.text == "12/03/1990" and candidate.confidence == 0.8
+    assert candidate.box == (10, 80, 120, 100)
+
+
+@pytest.mark.parametrize('results', [
+    ["Born 12/03/1990", "Valid throughout India"],
+    ["Printed on 01/05/2024", "Name: Asha Verma", "12/03/1990"],
+    [((10, 10, 200, 30), "Download Date 01/05/2024", 0.9), ((10, 200, 120, 220), "12/03/1990", 0.9)],
+])
+def test_a_distant_other_label_does_not_veto_an_unlabelled_dob(results):
+    assert best_dob(results, TODAY).text == "12/03/1990"
+
+
+def test_unlabelled_dates_prefer_the_earliest():
+    assert best_dob(["01/01/2019", "12/03/1990"], TODAY).text == "12/03/1990"
+
+
+@pytest.mark.parametrize('lines', [
+    ["Valid till 01/01/2030"],
+    ["Issue Date: 01/02/2015"],
+    ["DOB: 01/01/2030"],                        # in the future
+    ["DOB: 01/01/1850"],                        # older than anyone alive
+    ["no dates here"],
+])
+def test_no_usable_dob(lines):
+    assert best_dob(lines, TODAY) is None
+
+
+def test_date_candidates_keeps_every_date_ranked():
+    candidates = date_candidates(["Issue Date: 01/02/2015", "DOB: 12/03/1990", "31/02/1990"], TODAY)
+    assert [c.text for c in candidates] == ["12/03/1990", "01/02/2015"]
+    assert candidates[0].dob_distance == 0 and candidates[1].other_labelled
+
+
+@pytest.mark.parametrize('dob, expected', [
+    ("15/06/2006", 18),     # birthday today
+    ("16/06/2006", 17),     # birthday tomorrow
+    ("29/02/2000", 24),
+    ("16/06/2024", None),   # in the future
+    ("garbage", None),
+    (None, None),
+])
+def test_age_from_dob(dob, expected):
+    assert age_from_dob(dob, TODAY) == expected
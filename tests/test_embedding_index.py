@@ -0,0 +1,129 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_index import EmbeddingIndex
+
+
+def unit_vectors(count, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return EmbeddingIndex(str(tmp_path / "index"), dim=16, backend="test")
+
+
+def test_exact_search_finds_each_row_first(index):
+    vectors = unit_vectors(200)
+    index.add(vectors, [f"id-{i}" for i in range(200)])
+    scores, rows = index.search(vectors[:10], k=3)
+    assert rows[:, 0].tolist() == list(range(10))
+    assert np.allclose(scores[:, 0], 1.0, atol=1e-5)
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_search_pads_when_fewer_rows_than_k(index):
+    index.add(unit_vectors(2), ["a", "b"])
+    scores, rows = index.search(unit_vectors(1, seed=1), k=5)
+    assert rows[0, 2:].tolist() == [-1, -1, -1]
+    assert np.isneginf(scores[0, 2:]).all()
+
+
+def test_ivf_search_matches_exact_for_indexed_and_appended_rows(index):
+    vectors = unit_vectors(300)
+    index.add(vectors[:250], [str(i) for i in range(250)])
+    index.train_ivf(n_lists=4)
+    index.add(vectors[250:], [str(i) for i in range(250, 300)])
+    _, rows = index.search(vectors[[0, 100, 280]], k=1, mode="ivf", nprobe=4)
+    assert rows[:, 0].tolist() == [0, 100, 280]
+
+
+def test_lookup_filters_by_min_score(index):
+    vectors = unit_vectors(3)
+    index.add(vectors, ["a", "b", "c"])
+    assert index.lookup(vectors[1], k=3, min_score=0.99) == [("b", pytest.approx(1.0, abs=1e-5))]
+
+
+def test_reopen_restores_rows_labels_and_centroids(tmp_path):
+    path = str(tmp_path / "index")
+    vectors = unit_vectors(50)
+    first = EmbeddingIndex(path, dim=16, backend="test")
+    first.add(vectors, [{"id": i} for i in range(50)])
+    first.train_ivf(n_lists=3)
+
+    reopened = EmbeddingIndex(path)
+    assert len(reopened) == 50
+    assert reopened.labels[7] == {"id": 7}
+    assert reopened.centroids is not None
+    assert reopened.lookup(vectors[7], k=1)[0][0] == {"id": 7}
+
+
+def test_reopen_rejects_other_dim_or_backend(tmp_path):
+    path = str(tmp_path / "index")
+    EmbeddingIndex(path, dim=16, backend="test")
+    with pytest.raises(ValueError):
+        EmbeddingIndex(path, dim=32)
+    with pytest.raises(ValueError):
+        EmbeddingIndex(path, backend="other")
+
+
+def test_interrupted_append_is_ignored_and_overwritten(tmp_path):
+    path = str(tmp_path / "index")
+    vectors = unit_vectors(4)
+    index = EmbeddingIndex(path, dim=16, backend="test")
+    index.add(vectors[:2], ["a", "b"])
+    # A crash after the data files were written but before meta.json was updated
+    with open(os.path.join(path, "vectors.f32"), "ab") as f:
+        f.write(vectors[3].tobytes()[:40])
+    with open(os.path.join(path, "labels.jsonl"), "a", encoding="utf-8") as f:
+        f.write('"partial')
+
+    reopened = EmbeddingIndex(path)
+    assert len(reopened) == 2 and reopened.labels == ["a", "b"]
+    reopened.add(vectors[2:3], ["c"])
+    assert EmbeddingIndex(path).labels == ["a", "b", "c"]
+    assert os.path.getsize(os.path.join(path, "vectors.f32")) == 3 * 16 * 4
+    assert EmbeddingIndex(path).lookup(vectors[2], k=1)[0][0] == "c"
+
+
+def test_search_or_add_adds_only_unmatched_faces(index):
+    vectors = unit_vectors(2)
+    assert index.search_or_add(vectors[0], "a", min_score=0.9) == []
+    assert [label for label, _ in index.search_or_add(vectors[0], "b", min_score=0.9)] == ["a"]
+    assert index.search_or_add(vectors[1], "c", min_score=0.9) == []
+    assert index.labels == ["a", "c"]
+
+
+def test_concurrent_search_or_add_adds_a_face_once(index):
+    vector = unit_vectors(1)[0]
+    start = threading.Barrier(8)
+
+    def register(label):
+        start.wait()
+        index.search_or_add(vector, label, min_score=0.9)
+
+    threads = [threading.Thread(target=register, args=(f"id-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(index) == 1
+
+
+def test_register_identity_flags_only_a_different_identity(index):
+    from engine import identity_label, register_identity
+
+    face = unit_vectors(1)[0]
+    first = identity_label("12/03/1990", "photo-1")
+    assert register_identity(index, face, first, 0.9) == []
+    # A new photo of the same card: same DOB, different digest
+    assert register_identity(index, face, identity_label("12-03-1990", "photo-2"), 0.9) == []
+    duplicates = register_identity(index, face, identity_label("01/07/1985", "photo-3"), 0.9)
+    assert [label for label, _ in duplicates] == [first]
+    # Rows from before labels carried the DOB still match by digest
+    index.add(unit_vectors(2, seed=1)[1:], ["legacy"])
+    assert register_identity(index, unit_vectors(2, seed=1)[1], "legacy", 0.9) == []
@@ -0,0 +1,28 @@
+from concurrent.futures import Future
+
+import numpy as np
+
+from dob import DateCandidate, parse_date
+from engine import VerificationResult, _collect
+
+
+def done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_a_missing_face_without_the_face_gate_still_reports_why():
+    crop = np.zeros((32, 32, 3), np.uint8)
+    stages = {name: done(None) for name in ('gate_size', 'gate_face', 'gate_quality', 'document')}
+    stages.update(
+        quality=done({'overall_quality': 'Good'}),
+        dob=done(DateCandidate("12/03/1990", parse_date("12/03/1990"))),
+        face_id=done((None, None)),
+        face_selfie=done(((0, 0, 32, 32), crop)),
+    )
+    result = VerificationResult()
+    _collect(result, stages, lambda name, key, fn, label=None: fn(), {}, False, None, None)
+    assert result.failed_stage == 'face'
+    assert result.errors['face'] == "Could not detect faces in: government ID"
+    assert result.decision == "REJECTED"
@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import synthetic_face
+from face_tracking import FaceTracker, _iou
+
+
+def frame_with_face(left=200, top=100, side=200, size=(480, 640)):
+    gray = np.full(size, 120, dtype=np.uint8)
+    face = cv2.cvtColor(synthetic_face(side), cv2.COLOR_RGB2GRAY)
+    gray[top:top + side, left:left + side] = face
+    return gray
+
+
+def test_iou():
+    assert _iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert _iou((0, 0, 10, 10), (20, 20, 5, 5)) == 0.0
+    assert _iou((0, 0, 10, 10), (5, 0, 10, 10)) == pytest.approx(1 / 3)
+
+
+def test_first_frame_scans_then_tracks():
+    tracker = FaceTracker()
+    frame = frame_with_face()
+    box = tracker.update(frame)
+    assert box is not None and _iou(box, (200, 100, 200, 200)) > 0.5
+    for _ in range(5):
+        assert tracker.update(frame) is not None
+    assert tracker.stats()['full_scans'] == 1 and tracker.stats()['tracked_updates'] == 5
+
+
+def test_tracking_follows_a_moving_face():
+    tracker = FaceTracker()
+    tracker.update(frame_with_face(left=200))
+    box = tracker.update(frame_with_face(left=230))
+    assert box[0] > tracker.update(frame_with_face(left=200))[0] - 40
+    assert tracker.stats()['full_scans'] == 1
+
+
+def test_periodic_full_scan():
+    tracker = FaceTracker(redetect_interval=3)
+    frame = frame_with_face()
+    for _ in range(8):
+        tracker.update(frame)
+    assert tracker.stats()['full_scans'] == 2
+
+
+def test_a_lost_face_falls_back_to_full_scans():
+    tracker = FaceTracker()
+    tracker.update(frame_with_face())
+    blank = np.full((480, 640), 120, dtype=np.uint8)
+    assert tracker.update(blank) is None
+    assert tracker.box is None and tracker.confidence == 0.0
+    tracker.update(blank)
+    assert tracker.stats()['full_scans'] == 3
+
+
+def test_reset_forces_a_full_scan():
+    tracker = FaceTracker()
+    frame = frame_with_face()
+    tracker.update(frame)
+    tracker.reset()
+    tracker.update(frame)
+    assert tracker.stats()['full_scans'] == 2
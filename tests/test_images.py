@@ -0,0 +1,30 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from images import ImageDecodeError, ImageHandle
+
+
+def _jpeg(width, height):
+    buf = io.BytesIO()
+    Image.fromarray(np.zeros((height, width, 3), np.uint8)).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('width, height, decoded', [
+    (4000, 3000, (2000, 1500)),     # the long side alone has to cover the target
+    (3000, 4000, (1500, 2000)),
+    (1200, 900, (1200, 900)),       # already below the target
+])
+def test_draft_decode_keeps_the_long_side_at_the_target(width, height, decoded):
+    handle = ImageHandle(_jpeg(width, height), target_side=1600)
+    assert handle.probe() == ((width, height), decoded)
+    assert handle.rgb.shape[:2] == decoded[::-1]
+    assert handle.decode_scale == decoded[0] / width
+
+
+def test_undecodable_bytes_raise_a_value_error():
+    with pytest.raises(ImageDecodeError):
+        ImageHandle(b'not an image').rgb
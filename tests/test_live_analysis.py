@@ -0,0 +1,59 @@
+import numpy as np
+
+from live_analysis import AnalysisScheduler, FrameBuffers, analyze_frame
+
+
+def frame(value):
+    return np.full((480, 640, 3), value, dtype=np.uint8)
+
+
+def test_first_frame_is_always_analysed():
+    assert AnalysisScheduler().should_analyze(frame(100))
+
+
+def test_cheap_analyses_run_every_frame():
+    scheduler = AnalysisScheduler(frame_budget=1 / 30)
+    for _ in range(5):
+        assert scheduler.should_analyze(frame(100))
+        scheduler.record(0.005, analysed=True)
+    assert scheduler.interval == 1
+
+
+def test_slow_analyses_are_spread_over_frames():
+    scheduler = AnalysisScheduler(frame_budget=1 / 30, max_interval=15)
+    scheduler.should_analyze(frame(100))
+    scheduler.record(0.1, analysed=True)
+    assert scheduler.interval == 3
+    decisions = [scheduler.should_analyze(frame(100)) for _ in range(3)]
+    assert decisions == [False, False, True]
+
+
+def test_interval_is_capped():
+    scheduler = AnalysisScheduler(frame_budget=1 / 30, max_interval=4)
+    scheduler.record(10.0, analysed=True)
+    assert scheduler.interval == 4
+
+
+def test_a_scene_change_pulls_the_next_analysis_forward():
+    scheduler = AnalysisScheduler(frame_budget=1 / 30, max_interval=15, change_threshold=10.0)
+    scheduler.should_analyze(frame(100))
+    scheduler.record(0.3, analysed=True)
+    assert scheduler.interval == 9
+    decisions = [scheduler.should_analyze(frame(100)) for _ in range(4)]
+    assert not any(decisions)
+    assert scheduler.should_analyze(frame(200))
+    assert scheduler.stats()['analysed_frames'] == 1
+
+
+def test_frame_buffers_are_reused_until_the_resolution_changes():
+    buffers = FrameBuffers(detect_width=320).ensure((480, 640, 3))
+    gray = buffers.gray
+    assert buffers.ensure((480, 640, 3)).gray is gray
+    assert buffers.small_size == (320, 240)
+    assert buffers.ensure((720, 1280, 3)).gray.shape == (720, 1280)
+
+
+def test_analyze_frame_of_a_blank_frame():
+    metrics = analyze_frame(frame(128))
+    assert metrics['face_box'] is None and not metrics['face_centered']
+    assert metrics['brightness_score'] == 128 and metrics['blur_score'] == 0
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from memory import (
+    MB, MIN_WORKING_SIDE, BufferPool, MemoryBudget, MemoryBudgetExceeded, estimate_verification_bytes, working_side,
+)
+
+
+def test_estimate_grows_with_resolution_and_decode_size():
+    sizes = [(4000, 3000), (1280, 960)]
+    assert estimate_verification_bytes(sizes, 1600) > estimate_verification_bytes(sizes, 800)
+    assert estimate_verification_bytes(sizes, 1600, decode_sizes=[(1000, 750), (1280, 960)]) < \
+        estimate_verification_bytes(sizes, 1600)
+
+
+def test_working_side_fits_the_budget_but_not_below_the_minimum():
+    sizes = [(4000, 3000), (4000, 3000)]
+    side = working_side(sizes, 1600, budget=120 * MB)
+    assert MIN_WORKING_SIDE < side < 1600
+    assert estimate_verification_bytes(sizes, side) <= 120 * MB
+    assert working_side(sizes, 1600, budget=1) == MIN_WORKING_SIDE
+    assert working_side([(640, 480)], 1600, budget=1000 * MB) == 1600
+
+
+def test_budget_reserves_and_releases():
+    budget = MemoryBudget(100)
+    with budget.reserve(60) as reserved:
+        assert reserved == 60 and budget.stats()['reserved_mb'] == 60 / MB
+    assert budget.reserved == 0 and budget.peak == 60
+
+
+def test_a_request_larger_than_the_budget_runs_alone():
+    budget = MemoryBudget(100)
+    assert budget.acquire(500) == 100
+    budget.release(100)
+
+
+def test_budget_times_out_when_full():
+    budget = MemoryBudget(100)
+    budget.acquire(80)
+    with pytest.raises(MemoryBudgetExceeded):
+        budget.acquire(30, timeout=0.05)
+    assert budget.stats()['rejected'] == 1 and budget.stats()['waits'] == 1
+
+
+def test_a_waiting_request_proceeds_once_memory_is_released():
+    budget = MemoryBudget(100)
+    budget.acquire(80)
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(budget.acquire(50, timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    assert not acquired
+    budget.release(80)
+    waiter.join(5)
+    assert acquired == [50] and budget.reserved == 50
+
+
+def test_buffer_pool_reuses_buffers_across_shapes():
+    pool = BufferPool(limit=8 * MB)
+    with pool.borrow((100, 100), np.int16) as first:
+        assert first.shape == (100, 100) and first.dtype == np.int16
+        first.fill(7)
+    with pool.borrow((50, 50, 3), np.uint8, zero=True) as second:
+        assert not second.any()
+    assert pool.stats()['hits'] == 1 and pool.stats()['misses'] == 1
+    assert pool.stats()['buffers'] == 1
+
+
+def test_concurrent_borrows_get_separate_buffers():
+    pool = BufferPool(limit=8 * MB)
+    with pool.borrow((10,)) as a, pool.borrow((10,)) as b:
+        assert not np.shares_memory(a, b)
+    assert pool.stats()['buffers'] == 2
+
+
+def test_buffer_pool_drops_buffers_beyond_its_limit():
+    pool = BufferPool(limit=MB)
+    with pool.borrow((2 * MB,)):
+        pass
+    assert pool.stats()['buffers'] == 0
@@ -0,0 +1,66 @@
+import pytest
+
+import metrics
+from metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_counts_each_observation_in_its_bucket():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(seconds)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4 and histogram.sum == pytest.approx(2.65)
+
+
+def test_quantiles_interpolate_within_the_observed_range():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    assert histogram.quantile(0.5) is None
+    histogram.observe(0.574)
+    assert histogram.quantile(0.5) == pytest.approx(0.574)
+    for _ in range(99):
+        histogram.observe(0.05)
+    assert 0.05 <= histogram.quantile(0.5) <= 0.1
+    assert histogram.quantile(0.999) <= 0.574
+
+
+def test_values_above_the_last_bucket_report_the_maximum():
+    histogram = Histogram(buckets=(0.1,))
+    histogram.observe(3.0)
+    histogram.observe(5.0)
+    assert histogram.quantile(0.99) == 5.0
+
+
+def test_snapshot_reports_milliseconds_per_stage():
+    registry = MetricsRegistry(buckets=(0.01, 0.1))
+    registry.observe('ocr', 0.05)
+    registry.observe('ocr', 0.07)
+    data = registry.snapshot()['ocr']
+    assert data['count'] == 2 and data['mean_ms'] == pytest.approx(60)
+    assert data['buckets'] == {'0.01': 0, '0.1': 2, '+Inf': 0}
+
+
+def test_prometheus_text_has_cumulative_buckets():
+    registry = MetricsRegistry(buckets=(0.01, 0.1))
+    registry.observe('face"id', 0.005)
+    registry.observe('face"id', 0.05)
+    text = registry.prometheus_text()
+    assert '# TYPE realeyes_stage_seconds histogram' in text
+    assert 'realeyes_stage_seconds_bucket{stage="face\\"id",le="0.01"} 1' in text
+    assert 'realeyes_stage_seconds_bucket{stage="face\\"id",le="+Inf"} 2' in text
+    assert 'realeyes_stage_seconds_count{stage="face\\"id"} 2' in text
+
+
+def test_span_records_only_while_enabled(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, '_registry', registry)
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    with metrics.span('decode'):
+        pass
+    metrics.observe_timings({'ocr': 120.0})
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', False)
+    with metrics.span('decode'):
+        pass
+    metrics.observe('decode', 1.0)
+    snapshot = registry.snapshot()
+    assert snapshot['decode']['count'] == 1
+    assert snapshot['ocr']['sum_seconds'] == pytest.approx(0.12)
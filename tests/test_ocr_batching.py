@@ -0,0 +1,50 @@
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+import ocr_batching
+from ocr_batching import OcrBatcher
+
+
+class FakePool:
+    size = 2
+
+    def __init__(self):
+        self.readers = []
+
+    @contextmanager
+    def reader(self, timeout=None):
+        reader = object()
+        self.readers.append(reader)
+        yield reader
+
+
+def test_batches_run_concurrently_on_separate_readers(monkeypatch):
+    pool = FakePool()
+    both_running = threading.Barrier(2, timeout=5)
+
+    def detect(reader, images, max_side):
+        both_running.wait()     # breaks (and fails the jobs) unless two batches overlap
+        return [[(0, 0, 10, 10)] for _ in images]
+
+    monkeypatch.setattr(ocr_batching, 'get_reader_pool', lambda languages: pool)
+    monkeypatch.setattr(ocr_batching, 'detect_text_boxes_batch', detect)
+    monkeypatch.setattr(ocr_batching, 'recognize_boxes_batch',
+                        lambda reader, images, boxes, batch_size: [[(b[0], 'x', 1.0)] for b in boxes])
+
+    batcher = OcrBatcher(max_batch=1, max_wait_ms=0)
+    assert batcher.workers == 2
+    futures = [batcher.submit(np.zeros((20, 20), np.uint8)) for _ in range(2)]
+    assert [f.result(timeout=5) for f in futures] == [[((0, 0, 10, 10), 'x', 1.0)]] * 2
+    assert len(pool.readers) == 2
+    assert batcher.stats()['batches'] == 2
+
+
+def test_language_order_selects_its_own_pool_and_batcher():
+    from ocr import get_reader_pool
+
+    assert get_reader_pool(('hi', 'en')).languages == ('hi', 'en')
+    assert get_reader_pool(('en', 'hi')).languages == ('en', 'hi')
+    assert ocr_batching.get_ocr_batcher(('hi', 'en')).languages == ('hi', 'en')
+    assert ocr_batching.get_ocr_batcher(('en', 'hi')).languages == ('en', 'hi')
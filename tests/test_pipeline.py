@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import StageGraph
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_nodes_receive_their_dependencies_values_in_order(executor):
+    graph = StageGraph(executor)
+    graph.add('a', lambda: 2)
+    graph.add('b', lambda: 3)
+    graph.add('product', lambda a, b: a * b, after=('a', 'b'))
+    graph.add('label', lambda product, a: f"{product}/{a}", after=('product', 'a'))
+    stages = graph.run()
+    assert stages['label'].result(timeout=5) == "6/2"
+
+
+def test_a_node_starts_only_after_all_its_dependencies(executor):
+    finished = []
+    graph = StageGraph(executor)
+    graph.add('slow', lambda: (time.sleep(0.05), finished.append('slow')))
+    graph.add('fast', lambda: finished.append('fast'))
+    graph.add('after', lambda *_: list(finished), after=('slow', 'fast'))
+    assert sorted(graph.run()['after'].result(timeout=5)) == ['fast', 'slow']
+
+
+def test_independent_nodes_run_concurrently(executor):
+    both = threading.Barrier(2, timeout=5)
+    graph = StageGraph(executor)
+    graph.add('left', both.wait)
+    graph.add('right', both.wait)
+    stages = graph.run()
+    stages['left'].result(timeout=5)
+    stages['right'].result(timeout=5)
+
+
+def test_a_failure_propagates_to_dependants_without_running_them(executor):
+    ran = []
+
+    def fail():
+        raise KeyError('gate')
+
+    graph = StageGraph(executor)
+    graph.add('gate', fail)
+    graph.add('ocr', lambda _: ran.append('ocr'), after=('gate',))
+    graph.add('dob', lambda _: ran.append('dob'), after=('ocr',))
+    graph.add('other', lambda: ran.append('other'))
+    stages = graph.run()
+    with pytest.raises(KeyError):
+        stages['dob'].result(timeout=5)
+    assert isinstance(stages['ocr'].exception(timeout=5), KeyError)
+    stages['other'].result(timeout=5)
+    assert ran == ['other']
+
+
+def test_cancel_skips_nodes_that_have_not_started(executor):
+    ran = []
+    started, release = threading.Event(), threading.Event()
+    graph = StageGraph(executor)
+    graph.add('running', lambda: (started.set(), release.wait(5), ran.append('running')))
+    graph.add('next', lambda _: ran.append('next'), after=('running',))
+    graph.add('last', lambda _: ran.append('last'), after=('next',))
+    stages = graph.run()
+    assert started.wait(5)
+    graph.cancel()
+    release.set()
+    stages['running'].result(timeout=5)
+    assert stages['next'].cancelled() and stages['last'].cancelled()
+    assert ran == ['running']
+
+
+def test_cancel_skips_nodes_queued_behind_a_busy_executor():
+    ran = []
+    started, release = threading.Event(), threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        graph = StageGraph(executor)
+        graph.add('busy', lambda: (started.set(), release.wait(5)))
+        graph.add('queued', lambda: ran.append('queued'))
+        stages = graph.run()
+        assert started.wait(5)
+        graph.cancel()
+        release.set()
+        assert stages['queued'].exception(timeout=5) is not None
+    assert ran == []
+
+
+def test_a_shut_down_executor_fails_the_node_instead_of_raising():
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.shutdown()
+    graph = StageGraph(executor)
+    graph.add('a', lambda: 1)
+    graph.add('b', lambda a: a, after=('a',))
+    stages = graph.run()
+    assert isinstance(stages['a'].exception(timeout=5), RuntimeError)
+    assert isinstance(stages['b'].exception(timeout=5), RuntimeError)
+
+
+def test_unknown_or_duplicate_stages_are_rejected():
+    graph = StageGraph(ThreadPoolExecutor(max_workers=1))
+    graph.add('a', lambda: 1)
+    with pytest.raises(ValueError):
+        graph.add('a', lambda: 2)
+    with pytest.raises(ValueError):
+        graph.add('b', lambda a: a, after=('missing',))
@@ -0,0 +1,62 @@
+from engine import _read_dob_tiers, date_shaped_boxes, estimated_chars, neighbour_boxes
+
+TITLE = (10, 10, 600, 30)
+DOB_LABEL = (10, 50, 60, 70)
+DOB_VALUE = (80, 50, 190, 70)
+ISSUE_LABEL = (10, 90, 120, 110)
+ISSUE_VALUE = (130, 90, 240, 110)
+
+
+def reader(texts):
+    calls = []
+
+    def recognise(boxes):
+        calls.append(list(boxes))
+        return [(box, texts[box], 0.9) for box in boxes]
+
+    return recognise, calls
+
+
+def test_date_shaped_boxes_skips_long_lines_and_headlines():
+    headline = (10, 200, 100, 260)
+    boxes = [TITLE, DOB_LABEL, DOB_VALUE, ISSUE_VALUE, headline]
+    assert estimated_chars(DOB_VALUE) < 12 < estimated_chars(TITLE)
+    assert date_shaped_boxes(boxes) == [DOB_LABEL, DOB_VALUE, ISSUE_VALUE]
+    assert TITLE in date_shaped_boxes(boxes, max_chars=60)
+
+
+def test_neighbours_are_on_the_same_line_or_in_the_same_column():
+    below = (10, 72, 120, 92)
+    far_right = (600, 50, 700, 70)
+    assert neighbour_boxes([DOB_LABEL], [DOB_VALUE, below, far_right, ISSUE_VALUE]) == [DOB_VALUE, below]
+
+
+def test_a_labelled_dob_in_date_length_boxes_stops_at_the_first_tier():
+    texts = {TITLE: "GOVERNMENT OF INDIA IDENTITY CARD", DOB_LABEL: "DOB", DOB_VALUE: "12/03/1990",
+             ISSUE_LABEL: "Issue Date", ISSUE_VALUE: "01/01/2020"}
+    recognise, calls = reader(texts)
+    results = _read_dob_tiers(list(texts), recognise)
+    assert ((DOB_VALUE, "12/03/1990", 0.9)) in results
+    assert len(calls) == 1 and TITLE not in calls[0]
+
+
+def test_a_long_value_next_to_a_label_is_read_in_the_neighbour_tier():
+    value = (80, 50, 560, 70)
+    texts = {DOB_LABEL: "DOB", value: "12/03/1990 (day/month/year)"}
+    recognise, calls = reader(texts)
+    assert _read_dob_tiers(list(texts), recognise) is not None
+    assert calls == [[DOB_LABEL], [value]]
+
+
+def test_a_bilingual_label_and_date_line_is_read_in_the_last_tier():
+    line = (10, 130, 460, 150)
+    texts = {TITLE: "GOVERNMENT OF INDIA IDENTITY CARD", line: "Date of Birth / जन्म तिथि : 05/06/1985"}
+    recognise, calls = reader(texts)
+    assert _read_dob_tiers(list(texts), recognise) == [(line, texts[line], 0.9)]
+    assert calls == [[line]]
+
+
+def test_no_anchored_dob_means_a_full_read():
+    texts = {ISSUE_LABEL: "Issue", ISSUE_VALUE: "01/01/2020", (10, 130, 120, 150): "01/01/1990"}
+    recognise, _ = reader(texts)
+    assert _read_dob_tiers(list(texts), recognise) is None
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import result_cache
+from result_cache import StageCache, content_digest, estimate_size
+
+
+def test_get_or_compute_computes_once_per_key():
+    cache = StageCache()
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute('ocr', 'a', lambda: calls.append(1) or 'text') == 'text'
+    assert calls == [1]
+    assert cache.stats()['stages']['ocr'] == {'hits': 2, 'misses': 1}
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = StageCache(max_entries=2)
+    cache.put('s', 'a', 1)
+    cache.put('s', 'b', 2)
+    cache.get('s', 'a')
+    cache.put('s', 'c', 3)
+    assert cache.get('s', 'b') is None
+    assert cache.get('s', 'a') == 1 and cache.get('s', 'c') == 3
+
+
+def test_entries_are_evicted_to_stay_within_max_bytes():
+    cache = StageCache(max_bytes=2_500_000)
+    for key in 'abc':
+        cache.put('s', key, np.zeros(1_000_000, dtype=np.uint8))
+    assert cache.get('s', 'a') is None
+    assert cache.get('s', 'b') is not None and cache.get('s', 'c') is not None
+    assert cache.stats()['bytes'] <= cache.max_bytes
+
+
+def test_values_larger_than_the_cache_are_not_stored():
+    cache = StageCache(max_bytes=1000)
+    value = np.zeros(10_000, dtype=np.uint8)
+    assert cache.put('s', 'a', value) is value
+    assert cache.get('s', 'a') is None
+    assert cache.stats()['bytes'] == 0
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    cache = StageCache(ttl_seconds=10)
+    cache.put('s', 'a', 'value')
+    now[0] += 5
+    assert cache.get('s', 'a') == 'value'
+    now[0] += 6
+    assert cache.get('s', 'a') is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+
+
+def test_cached_arrays_are_read_only_but_the_callers_are_not():
+    cache = StageCache()
+    crop = np.zeros((4, 4, 3), dtype=np.uint8)
+    quality = {'histogram': np.zeros(8)}
+    cached_crop = cache.put('face', 'a', ((0, 0, 4, 4), crop))[1]
+    cached_quality = cache.put('quality', 'a', quality)
+    assert crop.flags.writeable and quality['histogram'].flags.writeable
+    assert not cached_crop.flags.writeable and not cached_quality['histogram'].flags.writeable
+    with pytest.raises(ValueError):
+        cached_crop[0, 0, 0] = 1
+    assert np.shares_memory(cached_crop, crop)
+
+
+def test_estimate_size_counts_a_shared_buffer_once():
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    views = {'rgb': image, 'bgr': image[..., ::-1], 'crop': image[10:20, 10:20]}
+    assert estimate_size(image) == image.nbytes
+    assert image.nbytes <= estimate_size(views) < 2 * image.nbytes
+    assert estimate_size([image, image.copy()]) >= 2 * image.nbytes
+
+
+def test_cache_bytes_return_to_zero_after_clear_and_eviction():
+    cache = StageCache(max_entries=1)
+    image = np.zeros(10_000, dtype=np.uint8)
+    cache.put('s', 'a', (image, image[:10]))
+    assert image.nbytes <= cache.stats()['bytes'] < 2 * image.nbytes
+    cache.put('s', 'b', 'small')
+    assert cache.stats()['bytes'] < image.nbytes
+    cache.clear()
+    assert cache.stats()['bytes'] == 0
+
+
+def test_content_digest_depends_on_shape_and_bytes():
+    a = np.zeros((2, 3), dtype=np.uint8)
+    assert content_digest(a) == content_digest(a.copy())
+    assert content_digest(a) != content_digest(a.reshape(3, 2))
+    assert content_digest(b"abc") != content_digest(b"abd")
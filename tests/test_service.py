@@ -0,0 +1,37 @@
+import asyncio
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import service
+from service import HttpError, VerificationService
+
+BODY = json.dumps({'id': base64.b64encode(b'id').decode(), 'selfie': base64.b64encode(b'selfie').decode()}).encode()
+
+
+def _service(monkeypatch, result):
+    monkeypatch.setattr(service, 'verify_request', lambda *args: dict(result, timings_ms={'worker_total': 1.0}))
+    svc = VerificationService(workers=1, warm_up=False)
+    svc.executor.shutdown()
+    svc.executor = ThreadPoolExecutor(max_workers=1)
+    svc.ready = True
+    return svc
+
+
+def test_a_gate_rejection_is_a_decision(monkeypatch):
+    svc = _service(monkeypatch, {'decision': 'REJECTED', 'errors': {'face': "Could not detect faces in: selfie"}})
+    status, payload = asyncio.run(svc.route('POST', '/verify', {'content-type': 'application/json'}, BODY))
+    assert (status, payload['decision']) == (200, 'REJECTED')
+    assert svc.counters['completed'] == 1
+
+
+@pytest.mark.parametrize('errors', [{'ocr': "No module named 'easyocr'"}, {'compare': "embedding failed"}])
+def test_an_infrastructure_failure_is_retryable(monkeypatch, errors):
+    svc = _service(monkeypatch, {'decision': 'REJECTED', 'errors': errors})
+    with pytest.raises(HttpError) as raised:
+        asyncio.run(svc.route('POST', '/verify', {'content-type': 'application/json'}, BODY))
+    assert raised.value.status == 503 and 'Retry-After' in raised.value.headers
+    assert raised.value.payload['decision'] == 'ERROR' and raised.value.payload['errors'] == errors
+    assert svc.counters['stage_errors'] == 1 and svc.counters['completed'] == 0
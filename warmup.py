@@ -0,0 +1,170 @@
+# Cold-start warm-up: load every model from the local model directory and push one dummy
+# input through each, so the first user after a deploy gets steady-state latency. Runs in a
+# background thread while the UI renders; the service runs it in each worker at startup.
+# Models are never downloaded at runtime; `--prefetch` fills the model directory beforehand.
+#
+#   python warmup.py --prefetch [--languages en] [--face-model]   # download models (deploy/build step)
+#   python warmup.py                                              # time a warm-up
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from detectors import get_face_cascade
+from embeddings import DEFAULT_FACE_MODEL, get_embedder
+from ocr import OCR_MODEL_DIR, get_reader_pool
+
+# Start the warm-up when the UI starts (REALEYES_WARMUP=0 to load models on first use instead)
+WARMUP_ENABLED = os.environ.get("REALEYES_WARMUP", "1") == "1"
+SFACE_MODEL_URL = (
+    "https://github.com/opencv/opencv_zoo/raw/main/models/face_recognition_sface/face_recognition_sface_2021dec.onnx"
+)
+
+
+def _warm_face_detector():
+    get_face_cascade().detectMultiScale(np.zeros((240, 320), dtype=np.uint8), 1.2, 5)
+
+
+def _warm_face_embedding():
+    get_embedder().embed([np.zeros((112, 112, 3), dtype=np.uint8)])
+
+
+def _warm_pipeline():
+    # One verification end to end on blank images: starts the stage threads and imports
+    # whatever the stages load lazily. Gates are off so every stage runs.
+    from engine import verify
+
+    blank = np.full((480, 640, 3), 200, dtype=np.uint8)
+    verify(blank, blank.copy(), policy="parallel", gates=())
+
+
+# Warm-up steps run in order in one thread. Each step's state is "pending", "running",
+# "ready" or "failed"; a failed step (e.g. missing OCR weights) does not stop the others.
+class WarmUp:
+    def __init__(self, languages=('en',)):
+        self.languages = tuple(languages)
+        self.steps = [
+            ('face_detector', _warm_face_detector),
+            ('face_embedding', _warm_face_embedding),
+            ('ocr', lambda: get_reader_pool(self.languages).warm_up()),
+            ('pipeline', _warm_pipeline),
+        ]
+        self.state = {name: {'status': 'pending', 'seconds': None, 'error': None} for name, _ in self.steps}
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+                self._thread.start()
+        return self
+
+    def run(self):
+        self.started = time.perf_counter()
+        try:
+            for name, step in self.steps:
+                self._set(name, status='running')
+                start = time.perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    self._set(name, status='failed', seconds=time.perf_counter() - start, error=str(e))
+                else:
+                    self._set(name, status='ready', seconds=time.perf_counter() - start)
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+        return self
+
+    def _set(self, name, **values):
+        with self._lock:
+            self.state[name].update(values)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def ready(self):
+        return self.done and all(step['status'] == 'ready' for step in self.status()['steps'].values())
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def status(self):
+        with self._lock:
+            steps = {name: dict(state) for name, state in self.state.items()}
+        return {
+            'done': self.done,
+            'seconds': (self.finished or time.perf_counter()) - self.started if self.started else 0.0,
+            'steps': steps,
+        }
+
+
+_warmups = {}
+_warmups_lock = threading.Lock()
+
+
+# Helper: The process-wide warm-up for a language set, started on first call
+def start_warmup(languages=('en',)):
+    key = tuple(languages)
+    with _warmups_lock:
+        warmup = _warmups.get(key)
+        if warmup is None:
+            warmup = _warmups[key] = WarmUp(key).start()
+        return warmup
+
+
+# Helper: Download EasyOCR weights for the languages into the model directory
+def prefetch_ocr(languages=('en',), model_dir=OCR_MODEL_DIR):
+    import easyocr
+
+    os.makedirs(model_dir, exist_ok=True)
+    easyocr.Reader(list(languages), gpu=False, model_storage_directory=model_dir, download_enabled=True)
+
+
+# Helper: Download the SFace recognition model used by the dnn embedding backend
+def prefetch_face_model(path=DEFAULT_FACE_MODEL, url=SFACE_MODEL_URL):
+    import urllib.request
+
+    if os.path.isfile(path):
+        return False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    partial = path + '.part'
+    urllib.request.urlretrieve(url, partial)
+    os.replace(partial, path)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch models, or time a cold-start warm-up")
+    parser.add_argument('--prefetch', action='store_true', help="Download models into the model directory")
+    parser.add_argument('--languages', nargs='+', default=['en'], help="EasyOCR languages")
+    parser.add_argument('--face-model', action='store_true', help="Also download the SFace model (dnn backend)")
+    args = parser.parse_args(argv)
+
+    if args.prefetch:
+        print(f"Downloading EasyOCR weights for {', '.join(args.languages)} into {OCR_MODEL_DIR}", file=sys.stderr)
+        prefetch_ocr(args.languages)
+        if args.face_model:
+            fetched = prefetch_face_model()
+            print(f"{'Downloaded' if fetched else 'Already present:'} {DEFAULT_FACE_MODEL}", file=sys.stderr)
+        return
+
+    status = WarmUp(args.languages).run().status()
+    for name, step in status['steps'].items():
+        seconds = f"{step['seconds']:.2f}s" if step['seconds'] is not None else "-"
+        print(f"{name:<16}{step['status']:<9}{seconds:>8}  {step['error'] or ''}")
+    print(f"total {status['seconds']:.2f}s")
+    sys.exit(0 if all(step['status'] == 'ready' for step in status['steps'].values()) else 1)
+
+
+if __name__ == '__main__':
+    main()